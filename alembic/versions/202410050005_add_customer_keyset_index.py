@@ -0,0 +1,22 @@
+﻿from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "202410050005"
+down_revision: Union[str, None] = "202410050004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_customers_gym_id_created_at_id",
+        "customers",
+        ["gym_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customers_gym_id_created_at_id", table_name="customers")
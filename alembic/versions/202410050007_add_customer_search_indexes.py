@@ -0,0 +1,73 @@
+﻿from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "202410050007"
+down_revision: Union[str, None] = "202410050006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+                first_name, last_name, email,
+                content='customers', content_rowid='id', tokenize='trigram'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN
+                INSERT INTO customers_fts(rowid, first_name, last_name, email)
+                VALUES (new.id, new.first_name, new.last_name, new.email);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN
+                INSERT INTO customers_fts(customers_fts, rowid, first_name, last_name, email)
+                VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS customers_fts_au
+            AFTER UPDATE OF first_name, last_name, email ON customers BEGIN
+                INSERT INTO customers_fts(customers_fts, rowid, first_name, last_name, email)
+                VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+                INSERT INTO customers_fts(rowid, first_name, last_name, email)
+                VALUES (new.id, new.first_name, new.last_name, new.email);
+            END
+            """
+        )
+        # Index rows that existed before the sync triggers.
+        op.execute("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_customers_first_name_trgm ON customers USING gin (first_name gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_customers_last_name_trgm ON customers USING gin (last_name gin_trgm_ops)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_customers_email_trgm ON customers USING gin (email gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS customers_fts_ai")
+        op.execute("DROP TABLE IF EXISTS customers_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_customers_email_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_customers_last_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_customers_first_name_trgm")
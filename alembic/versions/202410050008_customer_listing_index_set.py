@@ -0,0 +1,35 @@
+﻿from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "202410050008"
+down_revision: Union[str, None] = "202410050007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Widen the keyset index so `active`/age filters are evaluated from the index entry.
+    op.create_index(
+        "ix_customers_listing",
+        "customers",
+        ["gym_id", "created_at", "id", "active", "membership_end", "date_of_birth"],
+        unique=False,
+    )
+    op.drop_index("ix_customers_gym_id_created_at_id", table_name="customers")
+    # Redundant with the primary key and with the composite indexes leading on gym_id.
+    op.drop_index("ix_customers_gym_id", table_name="customers")
+    op.drop_index("ix_customers_id", table_name="customers")
+
+
+def downgrade() -> None:
+    op.create_index("ix_customers_id", "customers", ["id"], unique=False)
+    op.create_index("ix_customers_gym_id", "customers", ["gym_id"], unique=False)
+    op.create_index(
+        "ix_customers_gym_id_created_at_id",
+        "customers",
+        ["gym_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_customers_listing", table_name="customers")
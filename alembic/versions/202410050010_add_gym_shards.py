@@ -0,0 +1,32 @@
+﻿from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "202410050010"
+down_revision: Union[str, None] = "202410050009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "gym_shards",
+        sa.Column("gym_id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(length=255), nullable=False, unique=True),
+        sa.Column("shard", sa.String(length=64), nullable=False),
+    )
+    op.create_index("ix_gym_shards_shard", "gym_shards", ["shard"], unique=False)
+    # Existing gyms all live in the database being migrated, which becomes the default shard.
+    op.execute("INSERT INTO gym_shards (gym_id, email, shard) SELECT id, email, 'default' FROM gyms")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "SELECT setval(pg_get_serial_sequence('gym_shards', 'gym_id'), COALESCE(MAX(gym_id), 0) + 1, false) "
+            "FROM gym_shards"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_gym_shards_shard", table_name="gym_shards")
+    op.drop_table("gym_shards")
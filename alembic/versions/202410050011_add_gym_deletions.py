@@ -0,0 +1,29 @@
+﻿from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "202410050011"
+down_revision: Union[str, None] = "202410050010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "gym_deletions",
+        sa.Column("id", sa.String(length=32), primary_key=True),
+        sa.Column("gym_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="pending"),
+        sa.Column("deleted_customers", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_gym_deletions_gym_id", "gym_deletions", ["gym_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_gym_deletions_gym_id", table_name="gym_deletions")
+    op.drop_table("gym_deletions")
@@ -0,0 +1,34 @@
+﻿from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "202410050013"
+down_revision: Union[str, None] = "202410050012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.db.sharding.CUSTOMER_ID_BLOCK_SIZE.
+CUSTOMER_ID_BLOCK_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.create_table(
+        "customer_id_blocks",
+        sa.Column("block", sa.Integer(), primary_key=True),
+        sa.Column("allocated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    # Mark the block holding the highest existing customer id as used, so allocated ids start above it.
+    op.execute(
+        f"INSERT INTO customer_id_blocks (block) SELECT COALESCE(MAX(id), 0) / {CUSTOMER_ID_BLOCK_SIZE} FROM customers"
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "SELECT setval(pg_get_serial_sequence('customer_id_blocks', 'block'), MAX(block) + 1, false) "
+            "FROM customer_id_blocks"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("customer_id_blocks")
@@ -1,29 +1,57 @@
 ﻿from collections.abc import AsyncGenerator
+from typing import Any, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import get_api_prefix, get_settings
-from app.core.security import AuthError, decode_access_token
-from app.db.session import get_session
+from app.core.security import ACCESS_TOKEN_TYPE, AuthError, verify_access_token
+from app.db.session import get_read_session, get_session, shard_router
+from app.db.sharding import DEFAULT_SHARD, ShardRouter
 from app.domain import models
+from app.services import gyms as gym_service
+from app.services.token_revocation import revoked_tokens
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{get_api_prefix()}/auth/login", auto_error=True)
+settings = get_settings()
 
+READ_CONSISTENCY_HEADER = "X-Read-Consistency"
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
+# Subjects that recently sent a mutating request. Their reads go to the primary until the
+# replica has had time to catch up, so a client always sees its own writes.
+recent_writers: TTLCache[str, bool] = TTLCache(
+    "read_your_writes",
+    max_entries=100000,
+    ttl_seconds=settings.read_your_writes_seconds,
+)
+
+
+# Routes depend on sessions with ``Depends(get_db, scope="function")``: the session only checks a
+# connection out on its first query, and is closed as soon as the endpoint returns, before the
+# response is serialized and before background tasks such as welcome mails run. The pool then
+# sizes to concurrent database work rather than to concurrent HTTP requests. Streaming routes
+# keep the default request scope so the session outlives the endpoint.
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async for session in get_session():
         yield session
 
 
-async def get_current_gym(
-    token: str = Depends(oauth2_scheme),
-    session: AsyncSession = Depends(get_db),
-) -> models.Gym:
+async def get_replica_db() -> AsyncGenerator[AsyncSession, None]:
+    async for session in get_read_session():
+        yield session
+
+
+def get_shard_router() -> ShardRouter:
+    return shard_router
+
+
+async def get_token_payload(request: Request, token: str = Depends(oauth2_scheme)) -> dict[str, Any]:
     try:
-        payload = decode_access_token(token)
+        payload = verify_access_token(token)
     except AuthError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,6 +59,82 @@ async def get_current_gym(
             headers={"WWW-Authenticate": "Bearer"},
         ) from exc
 
+    # Tokens issued before refresh tokens existed carry no type and count as access tokens.
+    if payload.get("type", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if payload.get("jti") in revoked_tokens:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if request.method not in _SAFE_METHODS and payload.get("sub") is not None:
+        recent_writers.set(str(payload["sub"]), True)
+    return payload
+
+
+def _subject_gym_id(payload: dict[str, Any]) -> Optional[int]:
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _read_from_primary(request: Request, payload: dict[str, Any], router: ShardRouter) -> bool:
+    if request.headers.get(READ_CONSISTENCY_HEADER, "").lower() == "strong":
+        return True
+    if recent_writers.get(str(payload.get("sub"))) is not None:
+        return True
+    gym_id = _subject_gym_id(payload)
+    if not router.is_sharded or gym_id is None:
+        return False
+    # The read replica mirrors the default shard only.
+    return await router.shard_for_gym(gym_id) != DEFAULT_SHARD
+
+
+async def get_read_db(
+    request: Request,
+    payload: dict[str, Any] = Depends(get_token_payload),
+    primary: AsyncSession = Depends(get_db, scope="function"),
+    replica: AsyncSession = Depends(get_replica_db, scope="function"),
+    router: ShardRouter = Depends(get_shard_router),
+) -> AsyncSession:
+    """Session for read-only routes: the replica, unless the caller needs to read its own writes.
+
+    Clients on other workers than the one that took their write can send
+    ``X-Read-Consistency: strong`` to force the primary. Sessions connect lazily,
+    so the one not returned never checks out a connection.
+    """
+    return primary if await _read_from_primary(request, payload, router) else replica
+
+
+async def get_streaming_read_db(
+    request: Request,
+    payload: dict[str, Any] = Depends(get_token_payload),
+    primary: AsyncSession = Depends(get_db),
+    replica: AsyncSession = Depends(get_replica_db),
+    router: ShardRouter = Depends(get_shard_router),
+) -> AsyncSession:
+    """``get_read_db`` for streaming responses: the session stays open until the body is sent."""
+    session = primary if await _read_from_primary(request, payload, router) else replica
+    # get_current_gym_read routes its own (function-scoped) session, not this one.
+    gym_id = _subject_gym_id(payload)
+    if gym_id is not None:
+        await router.route(session, gym_id)
+    return session
+
+
+async def get_current_gym(
+    payload: dict[str, Any] = Depends(get_token_payload),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    router: ShardRouter = Depends(get_shard_router),
+) -> models.Gym:
     subject = payload.get("sub")
     if subject is None:
         raise HTTPException(
@@ -48,7 +152,8 @@ async def get_current_gym(
             headers={"WWW-Authenticate": "Bearer"},
         ) from exc
 
-    gym = await session.get(models.Gym, gym_id)
+    # Bind the request session to the gym's shard before anything queries through it.
+    gym = await gym_service.get_gym_principal(session, gym_id) if await router.route(session, gym_id) else None
     if gym is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,3 +162,25 @@ async def get_current_gym(
         )
 
     return gym
+
+
+async def get_current_gym_read(
+    payload: dict[str, Any] = Depends(get_token_payload),
+    session: AsyncSession = Depends(get_read_db),
+    primary: AsyncSession = Depends(get_db, scope="function"),
+    router: ShardRouter = Depends(get_shard_router),
+) -> models.Gym:
+    """``get_current_gym`` for read-only routes, resolved through the read session.
+
+    A gym that signed up moments ago may not have reached the replica yet; its principal
+    is then looked up on the primary, and its reads stay there for the read-your-writes
+    window.
+    """
+    try:
+        return await get_current_gym(payload, session, router)
+    except HTTPException:
+        if session is primary:
+            raise
+    gym = await get_current_gym(payload, primary, router)
+    recent_writers.set(str(gym.id), True)
+    return gym
@@ -1,24 +1,39 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+﻿import math
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_shard_router, get_token_payload
 from app.core.config import get_api_prefix
+from app.core.rate_limit import RateLimited
+from app.core.security import PasswordHashingUnavailable
+from app.db.sharding import ShardRouter
 from app.domain import schemas
 from app.services import auth as auth_service
 
 router = APIRouter(prefix=f"{get_api_prefix()}/auth", tags=["auth"])
 
 
+def _hashing_unavailable(exc: PasswordHashingUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/signup", response_model=schemas.GymOut, status_code=status.HTTP_201_CREATED)
 async def signup(
     gym_in: schemas.GymCreate,
-    background_tasks: BackgroundTasks,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    shards: ShardRouter = Depends(get_shard_router),
 ) -> schemas.GymOut:
     try:
-        schedule = background_tasks.add_task if background_tasks else None
-        gym = await auth_service.signup_gym(session, gym_in, schedule_mail=schedule)
+        gym = await auth_service.signup_gym(session, gym_in, router=shards)
+    except PasswordHashingUnavailable as exc:
+        raise _hashing_unavailable(exc) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     return gym
@@ -26,12 +41,52 @@ async def signup(
 
 @router.post("/login", response_model=schemas.Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    shards: ShardRouter = Depends(get_shard_router),
 ) -> schemas.Token:
+    client_ip = auth_service.trusted_proxies.client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+    )
     try:
-        token = await auth_service.authenticate_gym(session, form_data.username, form_data.password)
+        return await auth_service.authenticate_gym(
+            session, form_data.username, form_data.password, client_ip, router=shards
+        )
+    except RateLimited as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
+    except PasswordHashingUnavailable as exc:
+        raise _hashing_unavailable(exc) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return schemas.Token(access_token=token)
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh(
+    body: schemas.RefreshRequest,
+    session: AsyncSession = Depends(get_db, scope="function"),
+    shards: ShardRouter = Depends(get_shard_router),
+) -> schemas.Token:
+    try:
+        return await auth_service.refresh_tokens(session, body.refresh_token, router=shards)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(exc),
+            headers={"WWW-Authenticate": "Bearer"},
+        ) from exc
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: schemas.LogoutRequest | None = None,
+    payload: dict[str, Any] = Depends(get_token_payload),
+    session: AsyncSession = Depends(get_db, scope="function"),
+) -> Response:
+    await auth_service.logout(session, payload, body.refresh_token if body else None)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
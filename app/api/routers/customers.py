@@ -1,70 +1,190 @@
-﻿from typing import Optional
+﻿from dataclasses import asdict, dataclass
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_gym, get_db
+from app.api.deps import (
+    get_current_gym,
+    get_current_gym_read,
+    get_db,
+    get_read_db,
+    get_shard_router,
+    get_streaming_read_db,
+)
 from app.core.config import get_api_prefix
+from app.db.sharding import ShardRouter
 from app.domain import models, schemas
+from app.services import customer_bulk, customer_export, customer_import, customer_stats
 from app.services import customers as customer_service
 
 router = APIRouter(prefix=f"{get_api_prefix()}/customers", tags=["customers"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class CustomerFilterParams:
+    """Query parameters shared by every endpoint that selects a set of customers."""
+
+    active: Optional[bool] = Query(default=None)
+    search: Optional[str] = Query(default=None, min_length=1)
+    first_name: Optional[str] = Query(default=None, min_length=1)
+    last_name: Optional[str] = Query(default=None, min_length=1)
+    email: Optional[str] = Query(default=None, min_length=3)
+    min_age: Optional[int] = Query(default=None, ge=0)
+    max_age: Optional[int] = Query(default=None, ge=0)
+
 
 @router.post("", response_model=schemas.CustomerOut, status_code=status.HTTP_201_CREATED)
 async def create_customer(
     customer_in: schemas.CustomerCreate,
-    session: AsyncSession = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
+    session: AsyncSession = Depends(get_db, scope="function"),
     current_gym: models.Gym = Depends(get_current_gym),
+    shards: ShardRouter = Depends(get_shard_router),
 ) -> schemas.CustomerOut:
-    customer = await customer_service.create_customer(
+    customer = await customer_service.create_customer(session, current_gym, customer_in, router=shards)
+    return customer
+
+
+@router.post("/import", response_model=schemas.CustomerImportResult)
+async def import_customers(
+    request: Request,
+    import_format: Optional[customer_import.ImportFormat] = Query(default=None, alias="format"),
+    send_welcome: bool = Query(default=False),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    current_gym: models.Gym = Depends(get_current_gym),
+    shards: ShardRouter = Depends(get_shard_router),
+) -> schemas.CustomerImportResult:
+    try:
+        if import_format is None:
+            import_format = customer_import.format_from_content_type(request.headers.get("content-type"))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc)) from exc
+
+    return await customer_import.import_customers(
         session,
         current_gym,
-        customer_in,
-        schedule_mail=background_tasks.add_task if background_tasks else None,
+        request.stream(),
+        import_format,
+        send_welcome=send_welcome,
+        router=shards,
     )
-    return customer
 
 
 @router.get("", response_model=list[schemas.CustomerOut])
 async def list_customers(
-    active: Optional[bool] = Query(default=None),
-    search: Optional[str] = Query(default=None, min_length=1),
-    first_name: Optional[str] = Query(default=None, min_length=1),
-    last_name: Optional[str] = Query(default=None, min_length=1),
-    email: Optional[str] = Query(default=None, min_length=3),
-    min_age: Optional[int] = Query(default=None, ge=0),
-    max_age: Optional[int] = Query(default=None, ge=0),
+    filters: CustomerFilterParams = Depends(),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
-    session: AsyncSession = Depends(get_db),
-    current_gym: models.Gym = Depends(get_current_gym),
-) -> list[schemas.CustomerOut]:
+    cursor: Optional[str] = Query(default=None, min_length=1),
+    sort: customer_service.CustomerSort = Query(default="created_at"),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Comma-separated subset of customer fields to return (sparse fieldset).",
+    ),
+    session: AsyncSession = Depends(get_read_db),
+    current_gym: models.Gym = Depends(get_current_gym_read),
+) -> Response:
     try:
-        customers = await customer_service.list_customers(
+        selected_fields = customer_service.parse_fields(fields)
+        rows = await customer_service.list_customer_rows(
             session,
             current_gym.id,
-            active=active,
-            search=search,
-            first_name=first_name,
-            last_name=last_name,
-            email=email,
-            min_age=min_age,
-            max_age=max_age,
+            fields=selected_fields,
+            **asdict(filters),
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            sort=sort,
         )
-        return customers
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+    # Rows are serialized straight to JSON bytes, skipping ORM entities and response_model validation.
+    response = Response(content=customer_service.rows_to_json(rows, selected_fields), media_type="application/json")
+    # A full page means there may be more rows; expose the keyset cursor for the next one.
+    if len(rows) == limit and sort == "created_at":
+        response.headers[NEXT_CURSOR_HEADER] = customer_service.encode_cursor(rows[-1])
+    return response
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_customers(
+    export_format: customer_export.ExportFormat = Query(default="csv", alias="format"),
+    filters: CustomerFilterParams = Depends(),
+    session: AsyncSession = Depends(get_streaming_read_db),
+    current_gym: models.Gym = Depends(get_current_gym_read),
+) -> StreamingResponse:
+    try:
+        stmt = customer_export.build_export_query(session, current_gym.id, **asdict(filters))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return StreamingResponse(
+        customer_export.stream_export(session, stmt, export_format),
+        media_type=customer_export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="customers.{export_format}"'},
+    )
+
+
+@router.get("/stats", response_model=schemas.CustomerStats)
+async def get_customer_stats(
+    filters: CustomerFilterParams = Depends(),
+    session: AsyncSession = Depends(get_read_db),
+    current_gym: models.Gym = Depends(get_current_gym_read),
+) -> schemas.CustomerStats:
+    try:
+        return await customer_stats.customer_stats(session, current_gym.id, **asdict(filters))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.post("/bulk-update", response_model=schemas.BulkOperationResult)
+async def bulk_update_customers(
+    bulk_in: schemas.CustomerBulkUpdate,
+    filters: CustomerFilterParams = Depends(),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    current_gym: models.Gym = Depends(get_current_gym),
+) -> schemas.BulkOperationResult:
+    try:
+        affected = await customer_bulk.bulk_update_customers(
+            session,
+            current_gym.id,
+            bulk_in.patch,
+            ids=bulk_in.ids,
+            **asdict(filters),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return schemas.BulkOperationResult(affected=affected)
+
+
+@router.post("/bulk-delete", response_model=schemas.BulkOperationResult)
+async def bulk_delete_customers(
+    bulk_in: schemas.CustomerBulkDelete,
+    filters: CustomerFilterParams = Depends(),
+    session: AsyncSession = Depends(get_db, scope="function"),
+    current_gym: models.Gym = Depends(get_current_gym),
+) -> schemas.BulkOperationResult:
+    try:
+        affected = await customer_bulk.bulk_delete_customers(
+            session,
+            current_gym.id,
+            ids=bulk_in.ids,
+            **asdict(filters),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return schemas.BulkOperationResult(affected=affected)
+
 
 @router.get("/{customer_id}", response_model=schemas.CustomerOut)
 async def get_customer(
     customer_id: int,
-    session: AsyncSession = Depends(get_db),
-    current_gym: models.Gym = Depends(get_current_gym),
+    session: AsyncSession = Depends(get_read_db),
+    current_gym: models.Gym = Depends(get_current_gym_read),
 ) -> schemas.CustomerOut:
     customer = await customer_service.get_customer(session, current_gym.id, customer_id)
     if customer is None:
@@ -76,7 +196,7 @@ async def get_customer(
 async def update_customer(
     customer_id: int,
     customer_update: schemas.CustomerUpdate,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_db, scope="function"),
     current_gym: models.Gym = Depends(get_current_gym),
 ) -> schemas.CustomerOut:
     customer = await customer_service.update_customer(session, current_gym.id, customer_id, customer_update)
@@ -88,7 +208,7 @@ async def update_customer(
 @router.delete("/{customer_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_customer(
     customer_id: int,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_db, scope="function"),
     current_gym: models.Gym = Depends(get_current_gym),
 ) -> None:
     deleted = await customer_service.delete_customer(session, current_gym.id, customer_id)
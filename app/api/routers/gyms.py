@@ -1,8 +1,12 @@
-﻿from fastapi import APIRouter, Depends, status
+﻿from typing import Any
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_gym, get_db
+from app.api.deps import get_current_gym, get_current_gym_read, get_db, get_shard_router, get_token_payload
 from app.core.config import get_api_prefix
+from app.db.sharding import ShardRouter
 from app.domain import models, schemas
 from app.services import gyms as gym_service
 
@@ -10,23 +14,56 @@ router = APIRouter(prefix=f"{get_api_prefix()}/gyms", tags=["gyms"])
 
 
 @router.get("/me", response_model=schemas.GymOut)
-async def read_current_gym(current_gym: models.Gym = Depends(get_current_gym)) -> schemas.GymOut:
+async def read_current_gym(current_gym: models.Gym = Depends(get_current_gym_read)) -> schemas.GymOut:
     return current_gym
 
 
 @router.patch("/me", response_model=schemas.GymOut)
 async def update_current_gym(
     gym_update: schemas.GymUpdate,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_db, scope="function"),
     current_gym: models.Gym = Depends(get_current_gym),
 ) -> schemas.GymOut:
     updated = await gym_service.update_gym(session, current_gym, gym_update)
     return updated
 
 
-@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/me",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_202_ACCEPTED: {"model": schemas.GymDeletionOut}},
+)
 async def delete_current_gym(
-    session: AsyncSession = Depends(get_db),
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_db, scope="function"),
     current_gym: models.Gym = Depends(get_current_gym),
-) -> None:
-    await gym_service.delete_gym(session, current_gym)
+    shards: ShardRouter = Depends(get_shard_router),
+) -> Response:
+    if not await gym_service.is_large_gym(session, current_gym.id):
+        await gym_service.delete_gym(session, current_gym, router=shards)
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    # Large gyms are deleted after the response; the client polls the Location. A repeated
+    # request while a deletion is in progress gets that deletion back instead of a second run.
+    deletion, started = await gym_service.start_gym_deletion(session, current_gym, router=shards)
+    if started:
+        background_tasks.add_task(gym_service.run_gym_deletion, shards, deletion.id)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=schemas.GymDeletionOut.model_validate(deletion).model_dump(mode="json"),
+        headers={"Location": str(request.url_for("read_gym_deletion", deletion_id=deletion.id))},
+    )
+
+
+@router.get("/deletions/{deletion_id}", response_model=schemas.GymDeletionOut)
+async def read_gym_deletion(
+    deletion_id: str,
+    payload: dict[str, Any] = Depends(get_token_payload),
+    session: AsyncSession = Depends(get_db, scope="function"),
+) -> schemas.GymDeletionOut:
+    # Authorized by the token alone: the gym itself is gone once the deletion completes.
+    deletion = await gym_service.get_gym_deletion(session, deletion_id)
+    if deletion is None or str(deletion.gym_id) != payload.get("sub"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion not found")
+    return deletion
@@ -0,0 +1,64 @@
+"""Small in-process LRU cache with per-entry TTL and Prometheus hit/miss counters."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, Optional, TypeVar
+
+from app.core.metrics import CACHE_LOOKUPS_TOTAL
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded mapping whose entries expire after ``ttl_seconds``; ``set`` may shorten it per entry.
+
+    Not thread-safe; intended for use from a single event loop. Lookups are
+    counted under ``cache_lookups_total{cache=name}``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end(key)
+            CACHE_LOOKUPS_TOTAL.labels(cache=self._name, result="hit").inc()
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        CACHE_LOOKUPS_TOTAL.labels(cache=self._name, result="miss").inc()
+        return None
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        if self._max_entries <= 0:
+            return
+        ttl = self._ttl_seconds if ttl_seconds is None else min(ttl_seconds, self._ttl_seconds)
+        if ttl <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
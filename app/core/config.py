@@ -10,15 +10,70 @@ class Settings(BaseSettings):
     api_prefix: str = Field(default="/api/v1", alias="API_PREFIX")
     jwt_secret: str = Field(default="changeme", alias="JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256", alias="JWT_ALGORITHM")
-    access_token_expire_minutes: int = Field(default=60, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    access_token_expire_minutes: int = Field(default=15, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    refresh_token_expire_minutes: int = Field(default=20160, alias="REFRESH_TOKEN_EXPIRE_MINUTES")
+    revocation_sync_interval_seconds: float = Field(default=30, alias="REVOCATION_SYNC_INTERVAL_SECONDS")
     database_url: str = Field(default="sqlite+aiosqlite:///./app.db", alias="DATABASE_URL")
+    database_read_url: Optional[str] = Field(default=None, alias="DATABASE_READ_URL")
+    read_your_writes_seconds: float = Field(default=5, alias="READ_YOUR_WRITES_SECONDS")
+    # Extra shard databases as a JSON object of name -> URL; DATABASE_URL is the "default" shard.
+    database_shards: dict[str, str] = Field(default_factory=dict, alias="DATABASE_SHARDS")
+    shard_placement: str = Field(default="least_gyms", alias="SHARD_PLACEMENT")
+    shard_placement_targets: List[str] = Field(default_factory=list, alias="SHARD_PLACEMENT_TARGETS")
+    shard_map_cache_ttl_seconds: float = Field(default=60, alias="SHARD_MAP_CACHE_TTL_SECONDS")
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=30, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    # SQLite profile, applied to every connection of a file-backed SQLite database.
+    sqlite_profile_enabled: bool = Field(default=True, alias="SQLITE_PROFILE_ENABLED")
+    sqlite_journal_mode: str = Field(default="WAL", alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", alias="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_size: int = Field(default=-65536, alias="SQLITE_CACHE_SIZE")
+    sqlite_mmap_size: int = Field(default=268435456, alias="SQLITE_MMAP_SIZE")
+    sqlite_temp_store: str = Field(default="MEMORY", alias="SQLITE_TEMP_STORE")
+    slow_query_threshold_ms: float = Field(default=500, alias="SLOW_QUERY_THRESHOLD_MS")
+    slow_query_log_parameters: bool = Field(default=False, alias="SLOW_QUERY_LOG_PARAMETERS")
     cors_origins: List[str] = Field(default_factory=lambda: ["http://localhost:5173"])
 
+    password_hash_workers: int = Field(default=4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_queue: int = Field(default=32, alias="PASSWORD_HASH_MAX_QUEUE")
+
+    login_throttle_enabled: bool = Field(default=True, alias="LOGIN_THROTTLE_ENABLED")
+    login_email_burst: int = Field(default=5, alias="LOGIN_EMAIL_BURST")
+    login_email_per_minute: float = Field(default=5, alias="LOGIN_EMAIL_PER_MINUTE")
+    login_ip_burst: int = Field(default=20, alias="LOGIN_IP_BURST")
+    login_ip_per_minute: float = Field(default=30, alias="LOGIN_IP_PER_MINUTE")
+    login_throttle_max_keys: int = Field(default=100000, alias="LOGIN_THROTTLE_MAX_KEYS")
+    trusted_proxies: str = Field(default="", alias="TRUSTED_PROXIES")
+
+    token_cache_enabled: bool = Field(default=True, alias="TOKEN_CACHE_ENABLED")
+    token_cache_max_entries: int = Field(default=10000, alias="TOKEN_CACHE_MAX_ENTRIES")
+
+    principal_cache_enabled: bool = Field(default=True, alias="PRINCIPAL_CACHE_ENABLED")
+    principal_cache_ttl_seconds: float = Field(default=30, alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    principal_cache_max_entries: int = Field(default=10000, alias="PRINCIPAL_CACHE_MAX_ENTRIES")
+
+    customer_search_backend: str = Field(default="auto", alias="CUSTOMER_SEARCH_BACKEND")
+    gym_delete_chunk_size: int = Field(default=1000, alias="GYM_DELETE_CHUNK_SIZE")
+    gym_delete_sync_max_customers: int = Field(default=5000, alias="GYM_DELETE_SYNC_MAX_CUSTOMERS")
+    gym_delete_lease_seconds: float = Field(default=300, alias="GYM_DELETE_LEASE_SECONDS")
+    membership_sweep_interval_seconds: float = Field(default=3600, alias="MEMBERSHIP_SWEEP_INTERVAL_SECONDS")
+
     mailer_backend: str = Field(default="console", alias="MAILER_BACKEND")
     mailer_rate_limit_seconds: float = Field(default=0.5, alias="MAILER_RATE_LIMIT_SECONDS")
     mailer_max_retries: int = Field(default=3, alias="MAILER_MAX_RETRIES")
     mailer_retry_delay_seconds: float = Field(default=0.5, alias="MAILER_RETRY_DELAY_SECONDS")
 
+    email_outbox_poll_interval_seconds: float = Field(default=5, alias="EMAIL_OUTBOX_POLL_INTERVAL_SECONDS")
+    email_outbox_batch_size: int = Field(default=100, alias="EMAIL_OUTBOX_BATCH_SIZE")
+    email_outbox_lease_seconds: float = Field(default=300, alias="EMAIL_OUTBOX_LEASE_SECONDS")
+    email_outbox_max_attempts: int = Field(default=5, alias="EMAIL_OUTBOX_MAX_ATTEMPTS")
+    email_outbox_retry_delay_seconds: float = Field(default=60, alias="EMAIL_OUTBOX_RETRY_DELAY_SECONDS")
+    email_outbox_retention_hours: float = Field(default=168, alias="EMAIL_OUTBOX_RETENTION_HOURS")
+
     smtp_host: Optional[str] = Field(default=None, alias="SMTP_HOST")
     smtp_port: Optional[int] = Field(default=None, alias="SMTP_PORT")
     smtp_username: Optional[str] = Field(default=None, alias="SMTP_USERNAME")
@@ -26,6 +81,10 @@ class Settings(BaseSettings):
     smtp_use_tls: bool = Field(default=True, alias="SMTP_USE_TLS")
     smtp_use_ssl: bool = Field(default=False, alias="SMTP_USE_SSL")
     smtp_from_email: Optional[str] = Field(default=None, alias="SMTP_FROM_EMAIL")
+    smtp_pool_size: int = Field(default=4, alias="SMTP_POOL_SIZE")
+    smtp_pool_idle_timeout_seconds: float = Field(default=60, alias="SMTP_POOL_IDLE_TIMEOUT_SECONDS")
+    smtp_pool_noop_after_seconds: float = Field(default=5, alias="SMTP_POOL_NOOP_AFTER_SECONDS")
+    smtp_max_messages_per_connection: int = Field(default=100, alias="SMTP_MAX_MESSAGES_PER_CONNECTION")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -43,6 +102,13 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in value.split(",") if origin.strip()]
         return value
 
+    @field_validator("database_shards")
+    @classmethod
+    def reserve_default_shard(cls, value: dict[str, str]) -> dict[str, str]:
+        if "default" in value:
+            raise ValueError("DATABASE_SHARDS cannot redefine the 'default' shard, which is DATABASE_URL")
+        return value
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -2,6 +2,8 @@
 import smtplib
 import ssl
 import sys
+import threading
+import time
 from collections import deque
 from datetime import UTC, datetime
 from email.message import EmailMessage
@@ -14,9 +16,15 @@ from app.core.config import get_settings
 class Mailer:
     """Adapter interface for sending emails."""
 
+    # How many sends callers may usefully run at once.
+    max_concurrency = 1
+
     async def send(self, to: str, subject: str, body: str) -> None:  # pragma: no cover - interface definition
         raise NotImplementedError
 
+    async def close(self) -> None:
+        """Release held resources such as open connections."""
+
 
 class ConsoleMailer(Mailer):
     """Mailer implementation that writes messages to stdout."""
@@ -28,8 +36,31 @@ class ConsoleMailer(Mailer):
         print(message, file=sys.stdout)
 
 
+class _PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping the pool needs to retire it."""
+
+    def __init__(self, server: smtplib.SMTP) -> None:
+        self.server = server
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+
 class SMTPMailer(Mailer):
-    """Mailer implementation backed by SMTP."""
+    """Mailer implementation backed by SMTP.
+
+    Authenticated sessions are pooled and reused across sends. At most ``pool_size``
+    connections are open at once. A connection is retired after
+    ``max_messages_per_connection`` messages or ``idle_timeout`` seconds unused, and
+    one idle for longer than ``noop_after`` seconds is checked with ``NOOP`` before
+    it is reused. A send that finds its reused connection dropped is retried once on
+    a new connection.
+    """
 
     def __init__(
         self,
@@ -40,6 +71,12 @@ class SMTPMailer(Mailer):
         from_email: str,
         use_tls: bool,
         use_ssl: bool,
+        *,
+        pool_size: int = 4,
+        idle_timeout: float = 60,
+        noop_after: float = 5,
+        max_messages_per_connection: int = 100,
+        timeout: float = 30,
     ) -> None:
         self._host = host
         self._port = port
@@ -48,6 +85,16 @@ class SMTPMailer(Mailer):
         self._from_email = from_email
         self._use_tls = use_tls
         self._use_ssl = use_ssl
+        self.max_concurrency = max(pool_size, 1)
+        self._idle_timeout = idle_timeout
+        self._noop_after = noop_after
+        self._max_messages = max(max_messages_per_connection, 1)
+        self._timeout = timeout
+        self._ssl_context = ssl.create_default_context() if use_ssl or use_tls else None
+        # Sends run in worker threads, so the pool is guarded by thread primitives.
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._idle: list[_PooledConnection] = []
 
     async def send(self, to: str, subject: str, body: str) -> None:
         message = EmailMessage()
@@ -58,24 +105,93 @@ class SMTPMailer(Mailer):
 
         await asyncio.to_thread(self._send_sync, message)
 
+    async def close(self) -> None:
+        await asyncio.to_thread(self._close_idle)
+
     def _send_sync(self, message: EmailMessage) -> None:
-        context = ssl.create_default_context()
+        with self._slots:
+            connection = self._checkout()
+            try:
+                self._deliver(connection, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if not connection.messages_sent:
+                    raise
+                # The server dropped a reused connection after it was checked; retry once on a new one.
+                self._deliver(self._connect(), message)
+
+    def _deliver(self, connection: _PooledConnection, message: EmailMessage) -> None:
+        try:
+            connection.server.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            # Only this message was rejected; smtplib has reset the session, so it can be reused.
+            self._checkin(connection)
+            raise
+        except BaseException:
+            connection.server.close()
+            raise
+        connection.messages_sent += 1
+        self._checkin(connection)
 
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection = self._idle.pop()
+            idle_for = time.monotonic() - connection.last_used
+            if idle_for >= self._idle_timeout:
+                connection.close()
+                continue
+            if idle_for >= self._noop_after and not self._is_alive(connection):
+                connection.server.close()
+                continue
+            return connection
+        return self._connect()
+
+    def _checkin(self, connection: _PooledConnection) -> None:
+        if connection.server.sock is None:
+            # smtplib closes the socket itself when the server answers 421.
+            return
+        if connection.messages_sent >= self._max_messages:
+            connection.close()
+            return
+        connection.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(connection)
+
+    def _is_alive(self, connection: _PooledConnection) -> bool:
+        try:
+            code, _ = connection.server.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    def _connect(self) -> _PooledConnection:
         if self._use_ssl:
-            smtp_class = smtplib.SMTP_SSL
+            server: smtplib.SMTP = smtplib.SMTP_SSL(
+                self._host, self._port, timeout=self._timeout, context=self._ssl_context
+            )
         else:
-            smtp_class = smtplib.SMTP
-
-        with smtp_class(self._host, self._port, timeout=30) as server:
+            server = smtplib.SMTP(self._host, self._port, timeout=self._timeout)
+        try:
             if not self._use_ssl and self._use_tls:
-                server.starttls(context=context)
+                server.starttls(context=self._ssl_context)
             if self._username:
                 server.login(self._username, self._password or "")
-            server.send_message(message)
+        except BaseException:
+            server.close()
+            raise
+        return _PooledConnection(server)
+
+    def _close_idle(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
 
 
 class MailProxy(Mailer):
-    """Proxy that wraps a mailer with rate limiting, retries, and error suppression."""
+    """Proxy that wraps a mailer with rate limiting, retries, and optional error suppression."""
 
     def __init__(
         self,
@@ -84,8 +200,11 @@ class MailProxy(Mailer):
         max_retries: int = 3,
         retry_delay: float = 0.5,
         min_interval: float = 0.5,
+        suppress_errors: bool = True,
     ) -> None:
         self._mailer = mailer
+        self.max_concurrency = mailer.max_concurrency
+        self._suppress_errors = suppress_errors
         self._max_retries = max_retries
         self._retry_delay = retry_delay
         self._min_interval = min_interval
@@ -103,10 +222,15 @@ class MailProxy(Mailer):
             except Exception as exc:  # pragma: no cover - best effort logging
                 attempt += 1
                 if attempt > self._max_retries:
+                    if not self._suppress_errors:
+                        raise
                     print(f"[MailProxy] Failed to send email to {to}: {exc}", file=sys.stderr)
                     break
                 await asyncio.sleep(self._retry_delay)
 
+    async def close(self) -> None:
+        await self._mailer.close()
+
     async def _throttle(self) -> None:
         async with self._lock:
             now = datetime.now(UTC)
@@ -133,6 +257,10 @@ def get_mailer() -> Mailer:
             from_email=settings.smtp_from_email,
             use_tls=settings.smtp_use_tls,
             use_ssl=settings.smtp_use_ssl,
+            pool_size=settings.smtp_pool_size,
+            idle_timeout=settings.smtp_pool_idle_timeout_seconds,
+            noop_after=settings.smtp_pool_noop_after_seconds,
+            max_messages_per_connection=settings.smtp_max_messages_per_connection,
         )
     else:
         base_mailer = ConsoleMailer()
@@ -141,5 +269,14 @@ def get_mailer() -> Mailer:
         base_mailer,
         max_retries=settings.mailer_max_retries,
         retry_delay=settings.mailer_retry_delay_seconds,
-        min_interval=settings.mailer_rate_limit_seconds,
+        # MAILER_RATE_LIMIT_SECONDS spaces the sends on each connection, so the pool scales it.
+        min_interval=settings.mailer_rate_limit_seconds / base_mailer.max_concurrency,
+        # Mail goes through the outbox, which records the failure and retries later.
+        suppress_errors=False,
     )
+
+
+async def close_mailer() -> None:
+    """Close the shared mailer's connections, if it was ever created."""
+    if get_mailer.cache_info().currsize:
+        await get_mailer().close()
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import time
-from typing import Callable, Optional
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
 
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import PlainTextResponse
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
 
 # Prometheus metrics
 HTTP_REQUESTS_TOTAL = Counter(
@@ -21,12 +24,143 @@ HTTP_REQUEST_DURATION_SECONDS = Histogram(
     buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
 )
 
+CACHE_LOOKUPS_TOTAL = Counter(
+    "cache_lookups_total",
+    "In-process cache lookups by result",
+    ["cache", "result"],
+)
+
+DB_STATEMENT_DURATION_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time in seconds by operation and table",
+    ["operation", "table"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+DB_STATEMENT_ROWS = Histogram(
+    "db_statement_rows",
+    "Rows returned or affected per SQL statement, where the driver reports it",
+    ["operation", "table"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+
+HTTP_REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements issued per HTTP request",
+    ["method", "path"],
+    buckets=(0, 1, 2, 3, 4, 5, 10, 20, 50, 100),
+)
+
+PASSWORD_HASH_QUEUE_WAIT_SECONDS = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password operations wait for a hashing worker in seconds",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+PASSWORD_HASH_DURATION_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password in seconds",
+    ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+
+PASSWORD_HASH_REJECTED_TOTAL = Counter(
+    "password_hash_rejected_total",
+    "Password operations rejected because the hashing pool was saturated",
+    ["operation"],
+)
+
+RATE_LIMIT_DECISIONS_TOTAL = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by limiter and result",
+    ["limiter", "result"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    ["pool"],
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond pool_size (negative while the pool is still filling)",
+    ["pool"],
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the pool in seconds",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "db_pool_timeouts_total",
+    "Connection checkouts that gave up after pool_timeout",
+    ["pool"],
+)
+
+MEMBERSHIP_SWEEP_DEACTIVATED_TOTAL = Counter(
+    "membership_sweep_deactivated_total",
+    "Customers deactivated by the membership expiry sweeper",
+)
+
+MEMBERSHIP_SWEEP_DURATION_SECONDS = Histogram(
+    "membership_sweep_duration_seconds",
+    "Duration of a membership expiry sweep in seconds",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+
+EMAIL_OUTBOX_DELIVERIES_TOTAL = Counter(
+    "email_outbox_deliveries_total",
+    "Outbox mail delivery attempts by result (sent, retry, failed)",
+    ["result"],
+)
+
 
 def _get_path_template(request: Request) -> str:
-    route = request.scope.get("route")
+    return _scope_path_template(request.scope)
+
+
+def _scope_path_template(scope: dict[str, Any]) -> str:
+    route = scope.get("route")
     if route and hasattr(route, "path"):
         return route.path  # type: ignore[return-value]
-    return request.url.path
+    return scope["path"]
+
+
+class RequestDBStats:
+    """SQL activity of the HTTP request being served, filled in by the engine's cursor hooks."""
+
+    __slots__ = ("method", "statements", "_scope")
+
+    def __init__(self, method: str, scope: dict[str, Any]) -> None:
+        self.method = method
+        self.statements = 0
+        self._scope = scope
+
+    @property
+    def route(self) -> str:
+        # Resolved lazily: the router records the matched route in the scope after the middleware starts.
+        return _scope_path_template(self._scope)
+
+
+_request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_request_db_stats() -> Optional[RequestDBStats]:
+    return _request_db_stats.get()
+
+
+def register_pool_metrics(engine: AsyncEngine, name: str) -> None:
+    """Report ``engine``'s pool occupancy under ``pool=name``; sampled at scrape time."""
+    if not isinstance(engine.pool, QueuePool):
+        return
+    # Read through the engine, which swaps in a fresh pool on dispose().
+    DB_POOL_CHECKED_OUT.labels(pool=name).set_function(lambda: engine.pool.checkedout())
+    DB_POOL_OVERFLOW.labels(pool=name).set_function(lambda: engine.pool.overflow())
 
 
 def register_metrics(app: FastAPI) -> None:
@@ -35,11 +169,14 @@ def register_metrics(app: FastAPI) -> None:
         start_time = time.perf_counter()
         response: Optional[Response] = None
         status_code = "500"
+        db_stats = RequestDBStats(request.method, request.scope)
+        token = _request_db_stats.set(db_stats)
         try:
             response = await call_next(request)
             status_code = str(response.status_code)
             return response
         finally:
+            _request_db_stats.reset(token)
             duration = time.perf_counter() - start_time
             path = _get_path_template(request)
             method = request.method
@@ -47,6 +184,7 @@ def register_metrics(app: FastAPI) -> None:
             HTTP_REQUEST_DURATION_SECONDS.labels(
                 method=method, path=path, status_code=status_code
             ).observe(duration)
+            HTTP_REQUEST_DB_STATEMENTS.labels(method=method, path=path).observe(db_stats.statements)
 
     @app.get("/metrics")
     async def metrics() -> Response:
@@ -1,10 +1,24 @@
-﻿from datetime import datetime, timedelta, timezone
-from typing import Any
+﻿import asyncio
+import hashlib
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, TypeVar
 
 import jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.metrics import (
+    PASSWORD_HASH_DURATION_SECONDS,
+    PASSWORD_HASH_QUEUE_WAIT_SECONDS,
+    PASSWORD_HASH_REJECTED_TOTAL,
+)
+
+T = TypeVar("T")
 
 
 pwd_context = CryptContext(
@@ -27,13 +41,77 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHashingUnavailable(Exception):
+    """Raised when the password hashing pool is saturated and cannot accept more work."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, size-limited thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism. At most
+    ``workers + max_queue`` operations may be running or queued; beyond that callers
+    fail fast with :class:`PasswordHashingUnavailable` instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._capacity = workers + max_queue
+        self._pending = 0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def _run(self, operation: str, func: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self._capacity:
+            PASSWORD_HASH_REJECTED_TOTAL.labels(operation=operation).inc()
+            raise PasswordHashingUnavailable("Password hashing capacity exceeded")
+
+        submitted_at = time.perf_counter()
+
+        def timed_call() -> T:
+            started_at = time.perf_counter()
+            PASSWORD_HASH_QUEUE_WAIT_SECONDS.labels(operation=operation).observe(started_at - submitted_at)
+            try:
+                return func(*args)
+            finally:
+                PASSWORD_HASH_DURATION_SECONDS.labels(operation=operation).observe(time.perf_counter() - started_at)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed_call)
+        finally:
+            self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+def _create_token(subject: str, token_type: str, expires_delta: timedelta) -> str:
+    expire = datetime.now(timezone.utc) + expires_delta
+    payload: dict[str, Any] = {"sub": subject, "exp": expire, "jti": uuid.uuid4().hex, "type": token_type}
+    return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     if expires_delta is None:
         expires_delta = timedelta(minutes=settings.access_token_expire_minutes)
+    return _create_token(subject, ACCESS_TOKEN_TYPE, expires_delta)
 
-    expire = datetime.now(timezone.utc) + expires_delta
-    payload: dict[str, Any] = {"sub": subject, "exp": expire}
-    return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+def create_refresh_token(subject: str, expires_delta: timedelta | None = None) -> str:
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=settings.refresh_token_expire_minutes)
+    return _create_token(subject, REFRESH_TOKEN_TYPE, expires_delta)
 
 
 def decode_access_token(token: str) -> dict[str, Any]:
@@ -41,3 +119,27 @@ def decode_access_token(token: str) -> dict[str, Any]:
         return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
     except jwt.PyJWTError as exc:  # type: ignore[attr-defined]
         raise AuthError("Invalid token") from exc
+
+
+# Payloads of tokens that already passed ``decode_access_token``, keyed by a digest of the
+# token so raw bearer tokens are never held in memory. Entries expire at the token's ``exp``.
+token_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(
+    "verified_token",
+    max_entries=settings.token_cache_max_entries,
+    ttl_seconds=settings.access_token_expire_minutes * 60,
+)
+
+
+def verify_access_token(token: str) -> dict[str, Any]:
+    """Like ``decode_access_token``, but repeated tokens skip signature and claim checks."""
+    if not settings.token_cache_enabled:
+        return decode_access_token(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = decode_access_token(token)
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            token_cache.set(key, payload, ttl_seconds=exp - time.time())
+    return dict(payload)
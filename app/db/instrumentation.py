@@ -0,0 +1,107 @@
+"""SQL statement instrumentation: latency/row metrics, per-request counts and a slow-query log.
+
+Statements are labelled by operation and main table (``SELECT customers``) rather than
+by full text, which keeps metric cardinality bounded; the slow-query log carries the
+full statement, the route that issued it and, when enabled, its parameters with
+sensitive columns redacted.
+"""
+
+import logging
+import re
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import get_settings
+from app.core.metrics import DB_STATEMENT_DURATION_SECONDS, DB_STATEMENT_ROWS, current_request_db_stats
+
+logger = logging.getLogger("app.db.slow_query")
+settings = get_settings()
+
+MAX_LOGGED_PARAMETERS_LENGTH = 1000
+# Bound parameters for these columns (and ``<column>_<n>`` comparisons on them) are never logged.
+SENSITIVE_PARAMETER_NAMES = frozenset({"hashed_password", "email", "phone", "jti"})
+REDACTED = "<redacted>"
+
+_BIND_SUFFIX_PATTERN = re.compile(r"_\d+$")
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+
+def statement_labels(statement: str) -> tuple[str, str]:
+    """Return the ``(operation, table)`` a statement is reported under, e.g. ``("UPDATE", "gyms")``."""
+    words = statement.split(None, 1)
+    operation = words[0].upper() if words else "-"
+    match = _TABLE_PATTERN.search(statement)
+    return operation, match.group(1).lower() if match else "-"
+
+
+def _is_sensitive(bind_name: str) -> bool:
+    return _BIND_SUFFIX_PATTERN.sub("", bind_name) in SENSITIVE_PARAMETER_NAMES
+
+
+def redact_parameters(parameters: Any, bind_names: list[str] | None) -> Any:
+    """Return ``parameters`` with values bound to sensitive columns replaced by ``<redacted>``.
+
+    Named parameters are matched by key; positional ones by the compiled statement's
+    ``bind_names`` in order. Positional parameters without bind names are redacted wholesale.
+    """
+    if isinstance(parameters, list):
+        return [redact_parameters(row, bind_names) for row in parameters]
+    if isinstance(parameters, dict):
+        return {key: REDACTED if _is_sensitive(key) else value for key, value in parameters.items()}
+    if isinstance(parameters, tuple):
+        if bind_names is None or len(bind_names) != len(parameters):
+            return REDACTED if parameters else parameters
+        return tuple(REDACTED if _is_sensitive(name) else value for name, value in zip(bind_names, parameters))
+    return parameters
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    operation, table = statement_labels(statement)
+    DB_STATEMENT_DURATION_SECONDS.labels(operation=operation, table=table).observe(duration)
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount is not None and rowcount >= 0:
+        DB_STATEMENT_ROWS.labels(operation=operation, table=table).observe(rowcount)
+
+    stats = current_request_db_stats()
+    if stats is not None:
+        stats.statements += 1
+
+    threshold_ms = settings.slow_query_threshold_ms
+    if threshold_ms > 0 and duration * 1000 >= threshold_ms:
+        route = f"{stats.method} {stats.route}" if stats is not None else "-"
+        logged_parameters = REDACTED
+        if settings.slow_query_log_parameters:
+            compiled = getattr(context, "compiled", None)
+            bind_names = getattr(compiled, "positiontup", None)
+            logged_parameters = repr(redact_parameters(parameters, bind_names))[:MAX_LOGGED_PARAMETERS_LENGTH]
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s | parameters=%s",
+            duration * 1000,
+            route,
+            " ".join(statement.split()),
+            logged_parameters,
+        )
+
+
+def _handle_error(context: Any) -> None:
+    # Keep the timing stack balanced when a statement raises before after_cursor_execute.
+    conn = context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach the statement hooks to ``engine``."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,62 @@
+"""DDL for the customer search indexes.
+
+SQLite keeps an FTS5 trigram shadow table of ``customers`` in sync through
+triggers; Postgres relies on ``pg_trgm`` GIN indexes, which the database
+maintains itself. Triggers (rather than application hooks) keep the index
+correct for bulk SQL writes that bypass the ORM.
+
+Migration 202410050007 carries its own copy of this DDL; change the schema here
+through a new revision rather than by editing that one.
+"""
+
+from sqlalchemy import DDL, Table, event
+
+SEARCH_COLUMNS = ("first_name", "last_name", "email")
+
+SQLITE_FTS_TABLE = "customers_fts"
+
+SQLITE_CREATE_STATEMENTS = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5(
+        first_name, last_name, email,
+        content='customers', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS customers_fts_au AFTER UPDATE OF first_name, last_name, email ON customers BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+)
+
+SQLITE_DROP_STATEMENTS = (f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}",)
+
+POSTGRES_CREATE_STATEMENTS = ("CREATE EXTENSION IF NOT EXISTS pg_trgm",) + tuple(
+    f"CREATE INDEX IF NOT EXISTS ix_customers_{name}_trgm ON customers USING gin ({name} gin_trgm_ops)"
+    for name in SEARCH_COLUMNS
+)
+
+
+def register_search_ddl(customers: Table) -> None:
+    """Attach the search DDL to ``customers`` so ``metadata.create_all`` provisions it."""
+    for statement in SQLITE_CREATE_STATEMENTS:
+        event.listen(customers, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in SQLITE_DROP_STATEMENTS:
+        event.listen(customers, "after_drop", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_CREATE_STATEMENTS:
+        event.listen(customers, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -1,16 +1,93 @@
-﻿from collections.abc import AsyncGenerator
+﻿import time
+from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.metrics import DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS_TOTAL, register_pool_metrics
+from app.db.instrumentation import instrument_engine
+from app.db.sharding import DEFAULT_SHARD, ShardRouter
+from app.db.sqlite import is_file_sqlite, register_sqlite_pragmas
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout wait time and timeouts under ``pool=metrics_name``."""
+
+    metrics_name = "primary"
+
+    def connect(self) -> PoolProxiedConnection:
+        start_time = time.perf_counter()
+        try:
+            return super().connect()
+        except sa_exc.TimeoutError:
+            DB_POOL_TIMEOUTS_TOTAL.labels(pool=self.metrics_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool=self.metrics_name).observe(time.perf_counter() - start_time)
+
+    def recreate(self) -> "InstrumentedAsyncQueuePool":
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def engine_options(url: str, settings: Settings) -> dict[str, Any]:
+    """Pool arguments for ``create_async_engine``; in-memory SQLite keeps its single shared connection."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and not is_file_sqlite(url):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def create_engine(url: str, settings: Settings, name: str = "primary") -> AsyncEngine:
+    """Create an instrumented engine with the configured pool; pool metrics use ``pool=name``."""
+    engine = create_async_engine(url, future=True, echo=False, **engine_options(url, settings))
+    if isinstance(engine.pool, InstrumentedAsyncQueuePool):
+        engine.pool.metrics_name = name
+    register_pool_metrics(engine, name)
+    register_sqlite_pragmas(engine, settings)
+    instrument_engine(engine)
+    return engine
 
 
 settings = get_settings()
-engine = create_async_engine(settings.database_url, future=True, echo=False)
+engine = create_engine(settings.database_url, settings)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Read-only traffic goes to DATABASE_READ_URL when set; otherwise reads share the primary engine.
+read_engine = create_engine(settings.database_read_url, settings, name="replica") if settings.database_read_url else engine
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
+# DATABASE_URL is the default shard and holds the shard directory; DATABASE_SHARDS adds more.
+shard_router = ShardRouter(
+    {
+        DEFAULT_SHARD: engine,
+        **{name: create_engine(url, settings, name=f"shard_{name}") for name, url in settings.database_shards.items()},
+    },
+    placement=settings.shard_placement,
+    placement_targets=settings.shard_placement_targets,
+    cache_ttl_seconds=settings.shard_map_cache_ttl_seconds,
+)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Yield database session for request scope."""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Yield a session bound to the read replica (or the primary when none is configured)."""
+    async with ReadSessionLocal() as session:
+        yield session
@@ -0,0 +1,218 @@
+"""Per-gym shard routing across several databases.
+
+Every query is scoped by ``gym_id``, so a gym's rows live together in one shard
+database. The ``gym_shards`` directory on the default shard (``DATABASE_URL``)
+records where each gym lives and allocates gym ids. It also hands out blocks of
+customer ids, so rows keep their primary keys when a gym moves between shards.
+With a single database configured the router never reads the directory, so
+unsharded deployments pay nothing for it on the request path beyond one block
+allocation per ``CUSTOMER_ID_BLOCK_SIZE`` new customers.
+
+Sessions check a connection out on their first query, so a request session is
+moved to its gym's shard by rebinding it before that query runs.
+"""
+
+import zlib
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy import delete as sa_delete
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.domain import models
+
+DEFAULT_SHARD = "default"
+PLACEMENT_POLICIES = ("least_gyms", "hash")
+# Changing this would remap existing blocks onto overlapping ids.
+CUSTOMER_ID_BLOCK_SIZE = 1000
+
+
+class ShardRouter:
+    """Maps gym ids to shard engines and places new gyms with a configurable policy.
+
+    ``placement`` is ``least_gyms`` (the target shard holding the fewest gyms) or
+    ``hash`` (a stable hash of the signup email). ``placement_targets`` limits new
+    gyms to some shards, e.g. to stop filling one up; empty means all of them.
+    """
+
+    def __init__(
+        self,
+        engines: dict[str, AsyncEngine],
+        *,
+        placement: str = "least_gyms",
+        placement_targets: Iterable[str] = (),
+        cache_ttl_seconds: float = 60,
+        cache_max_entries: int = 100000,
+    ) -> None:
+        if DEFAULT_SHARD not in engines:
+            raise ValueError(f"The shard map needs a '{DEFAULT_SHARD}' shard")
+        if placement not in PLACEMENT_POLICIES:
+            raise ValueError(f"Unknown shard placement policy: {placement}")
+        targets = sorted(placement_targets) or sorted(engines)
+        unknown = set(targets) - set(engines)
+        if unknown:
+            raise ValueError(f"Unknown placement target shards: {', '.join(sorted(unknown))}")
+
+        self.engines = engines
+        self.placement = placement
+        self.placement_targets = targets
+        self._sessionmakers = {
+            name: async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            for name, engine in engines.items()
+        }
+        # gym id -> shard. Moves are offline, so entries only go stale when a gym moves
+        # under a running process; they expire after ``cache_ttl_seconds``.
+        self.placements: TTLCache[int, str] = TTLCache(
+            "gym_shard",
+            max_entries=cache_max_entries,
+            ttl_seconds=cache_ttl_seconds,
+        )
+        self._next_customer_id = 0
+        self._customer_id_block_end = 0
+
+    @property
+    def is_sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def session(self, shard: str = DEFAULT_SHARD) -> AsyncSession:
+        return self._sessionmakers[shard]()
+
+    def use_shard(self, session: AsyncSession, shard: str) -> None:
+        """Point ``session`` at ``shard``; it must not have run a query yet.
+
+        Sessions for the default shard are left alone, so a replica session stays on the replica.
+        """
+        if shard == DEFAULT_SHARD:
+            return
+        if session.in_transaction():
+            raise RuntimeError("Cannot move a session with an open transaction to another shard")
+        session.bind = self.engines[shard]
+
+    @asynccontextmanager
+    async def directory(self, session: AsyncSession) -> AsyncIterator[AsyncSession]:
+        """Session on the shard directory. Unsharded, that is ``session`` itself (same transaction)."""
+        if not self.is_sharded:
+            yield session
+            return
+        async with self.session() as directory:
+            yield directory
+
+    async def shard_for_gym(self, gym_id: int) -> Optional[str]:
+        """Shard holding ``gym_id``; ``None`` when the directory does not know the gym."""
+        if not self.is_sharded:
+            return DEFAULT_SHARD
+        shard = self.placements.get(gym_id)
+        if shard is None:
+            async with self.session() as directory:
+                shard = await directory.scalar(
+                    select(models.GymShard.shard).where(models.GymShard.gym_id == gym_id)
+                )
+            if shard is not None:
+                self.placements.set(gym_id, shard)
+        return shard
+
+    async def route(self, session: AsyncSession, gym_id: int) -> bool:
+        """Bind ``session`` to the shard of ``gym_id``. Returns ``False`` for unknown gyms."""
+        shard = await self.shard_for_gym(gym_id)
+        if shard is None:
+            return False
+        self.use_shard(session, shard)
+        return True
+
+    async def route_email(self, session: AsyncSession, email: str) -> bool:
+        """Bind ``session`` to the shard of the gym registered under ``email`` (login)."""
+        if not self.is_sharded:
+            return True
+        async with self.session() as directory:
+            entry = (
+                await directory.execute(
+                    select(models.GymShard.gym_id, models.GymShard.shard).where(models.GymShard.email == email)
+                )
+            ).first()
+        if entry is None:
+            return False
+        self.placements.set(entry.gym_id, entry.shard)
+        self.use_shard(session, entry.shard)
+        return True
+
+    async def choose_shard(self, directory: AsyncSession, email: str) -> str:
+        if len(self.placement_targets) == 1:
+            return self.placement_targets[0]
+        if self.placement == "hash":
+            index = zlib.crc32(email.strip().lower().encode("utf-8")) % len(self.placement_targets)
+            return self.placement_targets[index]
+
+        counts = dict(
+            (
+                await directory.execute(
+                    select(models.GymShard.shard, func.count())
+                    .where(models.GymShard.shard.in_(self.placement_targets))
+                    .group_by(models.GymShard.shard)
+                )
+            ).all()
+        )
+        return min(self.placement_targets, key=lambda shard: counts.get(shard, 0))
+
+    async def email_registered(self, session: AsyncSession, email: str) -> bool:
+        """Whether any shard has a gym under ``email``, via the directory's unique email index."""
+        async with self.directory(session) as directory:
+            gym_id = await directory.scalar(select(models.GymShard.gym_id).where(models.GymShard.email == email))
+        return gym_id is not None
+
+    async def register_gym(self, session: AsyncSession, email: str) -> tuple[int, str]:
+        """Allocate a gym id and place the gym; returns ``(gym_id, shard)``.
+
+        Sharded, the directory row is committed right away and ``session`` is bound to the
+        chosen shard; callers undo with ``unregister_gym`` if the gym insert then fails.
+        Unsharded, the row joins ``session``'s transaction. Raises ``IntegrityError`` when
+        the email is already registered on any shard.
+        """
+        async with self.directory(session) as directory:
+            shard = await self.choose_shard(directory, email) if self.is_sharded else DEFAULT_SHARD
+            gym_id = await directory.scalar(
+                insert(models.GymShard).values(email=email, shard=shard).returning(models.GymShard.gym_id)
+            )
+            if directory is not session:
+                await directory.commit()
+        if self.is_sharded:
+            self.placements.set(gym_id, shard)
+            self.use_shard(session, shard)
+        return gym_id, shard
+
+    async def unregister_gym(self, session: AsyncSession, gym_id: int) -> None:
+        """Drop the directory row of ``gym_id``; unsharded, inside ``session``'s transaction."""
+        async with self.directory(session) as directory:
+            await directory.execute(sa_delete(models.GymShard).where(models.GymShard.gym_id == gym_id))
+            if directory is not session:
+                await directory.commit()
+        self.placements.invalidate(gym_id)
+
+    async def allocate_customer_ids(self, session: AsyncSession, count: int) -> list[int]:
+        """Return ``count`` customer ids that no shard has used, from this process's current block.
+
+        Blocks are committed in their own transaction on the directory (unsharded, the database
+        ``session`` is bound to), so ``session``'s own transaction is left alone.
+        """
+        ids: list[int] = []
+        while len(ids) < count:
+            if self._next_customer_id >= self._customer_id_block_end:
+                bind = self.engines[DEFAULT_SHARD] if self.is_sharded else session.bind
+                async with AsyncSession(bind, expire_on_commit=False) as directory:
+                    block = await directory.scalar(
+                        insert(models.CustomerIdBlock).returning(models.CustomerIdBlock.block)
+                    )
+                    await directory.commit()
+                # A concurrent caller may have refilled meanwhile; the rest of its block is simply skipped.
+                self._next_customer_id = block * CUSTOMER_ID_BLOCK_SIZE
+                self._customer_id_block_end = self._next_customer_id + CUSTOMER_ID_BLOCK_SIZE
+            take = min(count - len(ids), self._customer_id_block_end - self._next_customer_id)
+            ids.extend(range(self._next_customer_id, self._next_customer_id + take))
+            self._next_customer_id += take
+        return ids
+
+    async def dispose(self) -> None:
+        for engine in self.engines.values():
+            await engine.dispose()
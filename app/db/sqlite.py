@@ -0,0 +1,43 @@
+"""SQLite production profile: per-connection PRAGMAs applied through the engine ``connect`` event.
+
+WAL lets readers proceed while a write is in progress, and ``busy_timeout`` makes
+writers queue for the lock instead of failing with "database is locked".
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import Settings
+
+
+def is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+
+
+def register_sqlite_pragmas(engine: AsyncEngine, settings: Settings) -> None:
+    """Run the profile's PRAGMAs on every new connection of a file-backed SQLite ``engine``."""
+    if not settings.sqlite_profile_enabled or not is_file_sqlite(str(engine.url)):
+        return
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
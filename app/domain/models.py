@@ -3,10 +3,11 @@
 from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.search import register_search_ddl
 
 
 def utcnow() -> datetime:
@@ -37,9 +38,25 @@ class Gym(Base):
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (
+        # Serves the listing order and keyset (cursor) pagination. The trailing filter
+        # columns let `active`/age predicates reject rows without touching the table.
+        Index(
+            "ix_customers_listing",
+            "gym_id",
+            "created_at",
+            "id",
+            "active",
+            "membership_end",
+            "date_of_birth",
+        ),
+        # Serves the expiry sweeper's per-gym `UPDATE`.
+        Index("ix_customers_gym_id_active_membership_end", "gym_id", "active", "membership_end"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    gym_id: Mapped[int] = mapped_column(ForeignKey("gyms.id", ondelete="CASCADE"), nullable=False, index=True)
+    # The composite indexes above lead with gym_id, so neither gym_id nor the primary key needs its own index.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    gym_id: Mapped[int] = mapped_column(ForeignKey("gyms.id", ondelete="CASCADE"), nullable=False)
     first_name: Mapped[str] = mapped_column(String(128), nullable=False)
     last_name: Mapped[str] = mapped_column(String(128), nullable=False)
     email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
@@ -55,3 +72,79 @@ class Customer(Base):
     )
 
     gym: Mapped[Gym] = relationship("Gym", back_populates="customers")
+
+
+class RevokedToken(Base):
+    """Denylist entry for a token ``jti``; rows are purged once the token would have expired anyway."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(String(64), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+
+class GymShard(Base):
+    """Shard directory entry: where a gym's rows live. Only the default shard's table is consulted.
+
+    The directory also allocates gym ids, so they stay unique across shards.
+    """
+
+    __tablename__ = "gym_shards"
+
+    gym_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    shard: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+
+
+class CustomerIdBlock(Base):
+    """Customer id block handed out by the shard directory, so customer ids are unique across shards.
+
+    Block ``n`` covers ids ``n * CUSTOMER_ID_BLOCK_SIZE`` up to the next block.
+    """
+
+    __tablename__ = "customer_id_blocks"
+
+    block: Mapped[int] = mapped_column(Integer, primary_key=True)
+    allocated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+
+class GymDeletion(Base):
+    """Progress of a background gym deletion. Lives on the default shard and outlives the gym."""
+
+    __tablename__ = "gym_deletions"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    gym_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    deleted_customers: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    # Touched when the run starts and after every chunk; a run silent for longer than the lease is abandoned.
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class EmailOutbox(Base):
+    """Mail waiting to be sent, written in the same transaction as the change that triggers it.
+
+    ``available_at`` is when the row may next be claimed: claiming pushes it out by a lease,
+    and failed attempts push it out by the retry backoff.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_available_at", "status", "available_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+register_search_ddl(Customer.__table__)
@@ -35,6 +35,17 @@ class GymOut(GymBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class GymDeletionOut(BaseModel):
+    id: str
+    gym_id: int
+    status: str
+    deleted_customers: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class CustomerBase(BaseModel):
     first_name: str
     last_name: str
@@ -72,6 +83,57 @@ class CustomerOut(CustomerBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CustomerAgeBands(BaseModel):
+    under_18: int
+    age_18_29: int
+    age_30_44: int
+    age_45_64: int
+    age_65_plus: int
+    unknown: int
+
+
+class CustomerStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    expiring_within_7_days: int
+    expiring_within_30_days: int
+    age_bands: CustomerAgeBands
+
+
+class CustomerBulkDelete(BaseModel):
+    ids: Optional[list[int]] = Field(default=None, min_length=1, max_length=10000)
+
+
+class CustomerBulkUpdate(CustomerBulkDelete):
+    patch: CustomerUpdate
+
+
+class BulkOperationResult(BaseModel):
+    affected: int
+
+
+class CustomerImportRowError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class CustomerImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[CustomerImportRowError]
+    errors_truncated: bool = False
+
+
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
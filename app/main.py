@@ -1,20 +1,57 @@
-﻿import logging
+﻿import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.api.routers import auth, customers, gyms
+from app.api.routers.customers import NEXT_CURSOR_HEADER
 from app.core.config import get_settings
 from app.core.logging import setup_logging
+from app.core.mailer import close_mailer
 from app.core.metrics import register_metrics
+from app.db.session import engine, read_engine, shard_router
+from app.workers import email_outbox, membership_sweeper, revocation_sync
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    background_tasks: list[asyncio.Task[None]] = []
+    if settings.membership_sweep_interval_seconds > 0:
+        background_tasks.append(
+            asyncio.create_task(membership_sweeper.run_forever(settings.membership_sweep_interval_seconds))
+        )
+    if settings.revocation_sync_interval_seconds > 0:
+        background_tasks.append(
+            asyncio.create_task(revocation_sync.run_forever(settings.revocation_sync_interval_seconds))
+        )
+    if settings.email_outbox_poll_interval_seconds > 0:
+        background_tasks.append(
+            asyncio.create_task(email_outbox.run_forever(settings.email_outbox_poll_interval_seconds))
+        )
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        for task in background_tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await close_mailer()
+        await shard_router.dispose()
+        if read_engine is not engine:
+            await read_engine.dispose()
 
 
 def create_application() -> FastAPI:
     setup_logging()
 
     settings = get_settings()
-    app = FastAPI(title=settings.project_name)
+    app = FastAPI(title=settings.project_name, lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -22,6 +59,7 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
 
     register_metrics(app)
@@ -31,6 +69,7 @@ def create_application() -> FastAPI:
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail, "status_code": exc.status_code},
+            headers=exc.headers,
         )
 
     @app.exception_handler(Exception)
@@ -1,75 +1,194 @@
-﻿import asyncio
-import logging
-from collections.abc import Callable
+﻿import logging
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import mailer as mailer_module
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.config import get_settings
+from app.core.rate_limit import TokenBucketLimiter, TrustedProxies
+from app.core.security import (
+    REFRESH_TOKEN_TYPE,
+    AuthError,
+    create_access_token,
+    create_refresh_token,
+    decode_access_token,
+    password_hasher,
+)
+from app.db.session import shard_router
+from app.db.sharding import ShardRouter
 from app.domain import models, schemas
+from app.services import email_outbox
+from app.services.token_revocation import consume_token, revoke_token, revoked_tokens
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Login attempts are throttled before the gym lookup and bcrypt, so guessing against one
+# account or from one address costs a bounded amount of hashing CPU.
+login_email_limiter = TokenBucketLimiter(
+    "login_email",
+    capacity=settings.login_email_burst,
+    refill_per_second=settings.login_email_per_minute / 60,
+    max_keys=settings.login_throttle_max_keys,
+)
+login_ip_limiter = TokenBucketLimiter(
+    "login_ip",
+    capacity=settings.login_ip_burst,
+    refill_per_second=settings.login_ip_per_minute / 60,
+    max_keys=settings.login_throttle_max_keys,
+)
+# Behind a proxy every connection comes from the proxy, so the IP bucket must be keyed by
+# the forwarded client address or one bucket would throttle all logins.
+trusted_proxies = TrustedProxies(settings.trusted_proxies)
+
+
+def welcome_gym_message(gym: models.Gym) -> tuple[str, str]:
+    """Return the ``(subject, body)`` of the welcome email for a newly signed-up ``gym``."""
+    subject = "Welcome to your Gym Dashboard!"
+    body_lines = [
+        f"Hi {gym.name},",
+        "",
+        "Your gym account has been created successfully.",
+        "Here are a few quick tips to get started:",
+        "  • Use your email to log in from the dashboard.",
+        "  • Invite your trainers and staff to collaborate.",
+        "  • Add customers to begin tracking memberships.",
+        "",
+        "We're glad to have you with us!",
+        "The Gym Manager Team",
+    ]
+    return subject, "\n".join(body_lines)
 
 
 async def signup_gym(
     session: AsyncSession,
     gym_in: schemas.GymCreate,
-    schedule_mail: Callable[[Callable[..., Any], Any, Any], Any] | None = None,
+    router: ShardRouter = shard_router,
 ) -> models.Gym:
-    existing = await session.execute(select(models.Gym).where(models.Gym.email == gym_in.email))
-    if existing.scalar_one_or_none() is not None:
+    # Probe the directory's email index before bcrypt so duplicate signups cost no hashing CPU,
+    # and end the read transaction so no connection is held through the hash.
+    already_registered = await router.email_registered(session, gym_in.email)
+    await session.commit()
+    if already_registered:
         raise ValueError("Email already registered")
 
-    gym = models.Gym(
-        name=gym_in.name,
-        email=gym_in.email,
-        hashed_password=get_password_hash(gym_in.password),
-        address=gym_in.address,
-        description=gym_in.description,
-        gym_type=gym_in.gym_type,
-        monthly_fee_cents=gym_in.monthly_fee_cents,
-        currency=gym_in.currency,
-    )
-
-    session.add(gym)
-    await session.commit()
-    await session.refresh(gym)
+    hashed_password = await password_hasher.hash(gym_in.password)
+    # The directory's unique index still rejects a concurrent signup that raced past the probe;
+    # registering also allocates the gym id.
+    try:
+        gym_id, _ = await router.register_gym(session, gym_in.email)
+    except IntegrityError as exc:
+        await session.rollback()
+        raise ValueError("Email already registered") from exc
 
-    # Send welcome email; failures are logged but do not block signup.
+    stmt = (
+        insert(models.Gym)
+        .values(
+            id=gym_id,
+            name=gym_in.name,
+            email=gym_in.email,
+            hashed_password=hashed_password,
+            address=gym_in.address,
+            description=gym_in.description,
+            gym_type=gym_in.gym_type,
+            monthly_fee_cents=gym_in.monthly_fee_cents,
+            currency=gym_in.currency,
+        )
+        .returning(models.Gym)
+    )
     try:
-        mailer = mailer_module.get_mailer()
-        subject = "Welcome to your Gym Dashboard!"
-        body_lines = [
-            f"Hi {gym.name},",
-            "",
-            "Your gym account has been created successfully.",
-            "Here are a few quick tips to get started:",
-            "  • Use your email to log in from the dashboard.",
-            "  • Invite your trainers and staff to collaborate.",
-            "  • Add customers to begin tracking memberships.",
-            "",
-            "We're glad to have you with us!",
-            "The Gym Manager Team",
-        ]
-        if schedule_mail:
-            maybe_task = schedule_mail(mailer.send, gym.email, subject, "\n".join(body_lines))
-            if asyncio.iscoroutine(maybe_task) or isinstance(maybe_task, asyncio.Task):
-                await maybe_task
-        else:
-            await mailer.send(to=gym.email, subject=subject, body="\n".join(body_lines))
-    except Exception:
-        logger.exception("Failed to send welcome email to gym %s", gym.email)
+        gym = await session.scalar(stmt)
+        # The welcome mail is queued in the same transaction, so it exists exactly when the gym does.
+        await email_outbox.enqueue_email(session, gym.email, *welcome_gym_message(gym))
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        if router.is_sharded:
+            await router.unregister_gym(session, gym_id)
+        raise ValueError("Email already registered") from exc
 
     return gym
 
 
-async def authenticate_gym(session: AsyncSession, username: str, password: str) -> str:
+def issue_tokens(gym_id: int) -> schemas.Token:
+    return schemas.Token(
+        access_token=create_access_token(subject=str(gym_id)),
+        refresh_token=create_refresh_token(subject=str(gym_id)),
+    )
+
+
+async def authenticate_gym(
+    session: AsyncSession,
+    username: str,
+    password: str,
+    client_ip: str | None = None,
+    router: ShardRouter = shard_router,
+) -> schemas.Token:
+    """Check credentials and issue tokens. Raises ``RateLimited`` when the email or IP is throttled."""
+    if settings.login_throttle_enabled:
+        if client_ip is not None:
+            login_ip_limiter.check(client_ip)
+        login_email_limiter.check(username.strip().lower())
+
+    if not await router.route_email(session, username):
+        raise ValueError("Incorrect email or password")
     result = await session.execute(select(models.Gym).where(models.Gym.email == username))
     gym = result.scalar_one_or_none()
+    # End the read transaction so the pool connection is not held through the bcrypt check.
+    await session.commit()
 
-    if gym is None or not verify_password(password, gym.hashed_password):
+    if gym is None or not await password_hasher.verify(password, gym.hashed_password):
         raise ValueError("Incorrect email or password")
 
-    return create_access_token(subject=str(gym.id))
+    return issue_tokens(gym.id)
+
+
+def _decode_refresh_token(refresh_token: str) -> dict[str, Any]:
+    try:
+        payload = decode_access_token(refresh_token)
+    except AuthError as exc:
+        raise ValueError("Invalid refresh token") from exc
+    if payload.get("type") != REFRESH_TOKEN_TYPE or payload.get("jti") in revoked_tokens:
+        raise ValueError("Invalid refresh token")
+    return payload
+
+
+async def refresh_tokens(
+    session: AsyncSession,
+    refresh_token: str,
+    router: ShardRouter = shard_router,
+) -> schemas.Token:
+    """Exchange a refresh token for a new token pair. Refresh tokens are single use."""
+    payload = _decode_refresh_token(refresh_token)
+    try:
+        gym_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid refresh token") from exc
+    # Sharded, the directory is authoritative for which gyms exist; ``session`` stays on the
+    # default shard, where revocations are recorded.
+    if router.is_sharded:
+        exists = await router.shard_for_gym(gym_id) is not None
+    else:
+        exists = await session.get(models.Gym, gym_id) is not None
+    if not exists:
+        raise ValueError("Invalid refresh token")
+
+    # The in-memory denylist is only a fast path; the revocation row's primary key decides
+    # which of several concurrent refreshes with the same token succeeds.
+    if not await consume_token(session, payload):
+        raise ValueError("Invalid refresh token")
+    return issue_tokens(gym_id)
+
+
+async def logout(session: AsyncSession, access_payload: dict[str, Any], refresh_token: str | None = None) -> None:
+    """Revoke the caller's access token and, when given, the refresh token of the same gym."""
+    await revoke_token(session, access_payload)
+    if refresh_token is None:
+        return
+    try:
+        refresh_payload = _decode_refresh_token(refresh_token)
+    except ValueError:
+        return
+    if refresh_payload.get("sub") == access_payload.get("sub"):
+        await revoke_token(session, refresh_payload)
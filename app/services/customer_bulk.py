@@ -0,0 +1,138 @@
+"""Set-based bulk update and delete of a gym's customers.
+
+Targets are selected by explicit ids and/or the ``list_customers`` filter set,
+then modified with ``UPDATE``/``DELETE ... WHERE id IN (...)`` in id-ordered
+chunks, committing after each chunk to keep transactions short.
+"""
+
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, Optional
+
+from sqlalchemy import Select, case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain import models, schemas
+from app.services.customers import filter_customers, is_membership_expired, membership_lapsed
+
+BULK_CHUNK_SIZE = 1000
+
+_NON_NULLABLE_FIELDS = ("first_name", "last_name", "email", "active")
+
+
+def _target_ids_query(
+    session: AsyncSession,
+    gym_id: int,
+    ids: Optional[list[int]],
+    filters: dict[str, Any],
+) -> Select[tuple[int]]:
+    if not ids and all(value is None for value in filters.values()):
+        raise ValueError("Specify ids or at least one filter")
+
+    stmt = select(models.Customer.id).where(models.Customer.gym_id == gym_id)
+    if ids:
+        stmt = stmt.where(models.Customer.id.in_(ids))
+    return filter_customers(stmt, session, **filters)
+
+
+async def _iter_id_chunks(
+    session: AsyncSession,
+    stmt: Select[tuple[int]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> AsyncIterator[list[int]]:
+    # Seek on id rather than re-running the filter with OFFSET, so rows that stop
+    # matching after an update are neither revisited nor skipped.
+    last_id = 0
+    while True:
+        chunk_stmt = stmt.where(models.Customer.id > last_id).order_by(models.Customer.id).limit(chunk_size)
+        chunk = list((await session.scalars(chunk_stmt)).all())
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def _update_values(patch: schemas.CustomerUpdate) -> dict[str, Any]:
+    values = patch.model_dump(exclude_unset=True)
+    if not values:
+        raise ValueError("patch must set at least one field")
+    null_fields = [name for name in _NON_NULLABLE_FIELDS if name in values and values[name] is None]
+    if null_fields:
+        raise ValueError(f"patch cannot clear required fields: {', '.join(null_fields)}")
+
+    # Mirror the single-row write path: a lapsed membership is never stored as active.
+    if "membership_end" in values:
+        if is_membership_expired(values["membership_end"]):
+            values["active"] = False
+    elif values.get("active"):
+        values["active"] = case((membership_lapsed(), False), else_=True)
+    values["updated_at"] = models.utcnow()
+    return values
+
+
+async def bulk_update_customers(
+    session: AsyncSession,
+    gym_id: int,
+    patch: schemas.CustomerUpdate,
+    *,
+    ids: Optional[list[int]] = None,
+    **filters: Any,
+) -> int:
+    """Apply ``patch`` to the selected customers of ``gym_id``; returns the number of rows updated."""
+    values = _update_values(patch)
+    affected = 0
+    async for chunk in _iter_id_chunks(session, _target_ids_query(session, gym_id, ids, filters)):
+        result = await session.execute(
+            update(models.Customer)
+            .where(models.Customer.gym_id == gym_id, models.Customer.id.in_(chunk))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        affected += result.rowcount or 0
+    return affected
+
+
+async def bulk_delete_customers(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    ids: Optional[list[int]] = None,
+    **filters: Any,
+) -> int:
+    """Delete the selected customers of ``gym_id``; returns the number of rows deleted."""
+    affected = 0
+    async for chunk in _iter_id_chunks(session, _target_ids_query(session, gym_id, ids, filters)):
+        result = await session.execute(
+            delete(models.Customer)
+            .where(models.Customer.gym_id == gym_id, models.Customer.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        affected += result.rowcount or 0
+    return affected
+
+
+async def delete_gym_customers(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> int:
+    """Delete every customer of ``gym_id``, one committed chunk at a time; returns the number deleted.
+
+    ``on_chunk`` is awaited with the running total after each commit.
+    """
+    affected = 0
+    stmt = select(models.Customer.id).where(models.Customer.gym_id == gym_id)
+    async for chunk in _iter_id_chunks(session, stmt, chunk_size):
+        result = await session.execute(
+            delete(models.Customer)
+            .where(models.Customer.gym_id == gym_id, models.Customer.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        affected += result.rowcount or 0
+        if on_chunk is not None:
+            await on_chunk(affected)
+    return affected
@@ -0,0 +1,116 @@
+"""Constant-memory streaming export of a gym's customers as CSV or NDJSON.
+
+Rows are read through a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) as plain column tuples, so neither ORM objects nor Pydantic
+models are built, and each partition is encoded straight to bytes.
+"""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import date, datetime
+from typing import Any, Literal, Optional
+
+from sqlalchemy import Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain import models
+from app.services.customers import effectively_active, filter_customers
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "id",
+    "gym_id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "active",
+    "date_of_birth",
+    "membership_start",
+    "membership_end",
+    "notes",
+    "created_at",
+    "updated_at",
+)
+
+
+def build_export_query(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    active: Optional[bool] = None,
+    search: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+) -> Select:
+    """Build the export ``SELECT``; raises ``ValueError`` for invalid filters before streaming starts."""
+    columns = [
+        effectively_active().label(name) if name == "active" else getattr(models.Customer, name)
+        for name in EXPORT_COLUMNS
+    ]
+    stmt = filter_customers(
+        select(*columns).where(models.Customer.gym_id == gym_id),
+        session,
+        active=active,
+        search=search,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        min_age=min_age,
+        max_age=max_age,
+    )
+    return stmt.order_by(models.Customer.created_at.desc(), models.Customer.id.desc())
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(rows: Sequence[Row], include_header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(rows: Sequence[Row]) -> bytes:
+    lines = (json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default) for row in rows)
+    return "".join(f"{line}\n" for line in lines).encode("utf-8")
+
+
+async def stream_export(session: AsyncSession, stmt: Select, export_format: ExportFormat) -> AsyncIterator[bytes]:
+    """Yield ``stmt``'s rows encoded as ``export_format``, one chunk per fetched partition."""
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    if export_format == "csv":
+        # Emit the header even when there are no rows.
+        yield _encode_csv([], include_header=True)
+    async for partition in result.partitions():
+        if export_format == "csv":
+            yield _encode_csv(partition, include_header=False)
+        else:
+            yield _encode_ndjson(partition)
@@ -0,0 +1,179 @@
+﻿"""Streaming bulk import of customers from CSV or NDJSON request bodies.
+
+Rows are parsed incrementally, validated against ``schemas.CustomerCreate`` and
+inserted in fixed-size batches with a single multi-row ``INSERT`` each, so
+memory is bounded by the batch size rather than the upload size.
+"""
+
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import shard_router
+from app.db.sharding import ShardRouter
+from app.domain import models, schemas
+from app.services import email_outbox
+from app.services.customers import is_membership_expired, welcome_message
+
+ImportFormat = Literal["csv", "ndjson"]
+
+DEFAULT_BATCH_SIZE = 1000
+# Cap on per-row errors echoed back so a bad file cannot produce an unbounded response.
+MAX_REPORTED_ERRORS = 1000
+
+_CONTENT_TYPES: dict[str, ImportFormat] = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class _RowError(Exception):
+    def __init__(self, messages: list[str]) -> None:
+        super().__init__("; ".join(messages))
+        self.messages = messages
+
+
+@dataclass
+class _Record:
+    row: int
+    data: Any = None
+    error: Optional[str] = None
+
+
+def format_from_content_type(content_type: Optional[str]) -> ImportFormat:
+    """Map a request ``Content-Type`` to an import format; raises ``ValueError`` if unsupported."""
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    try:
+        return _CONTENT_TYPES[media_type]
+    except KeyError:
+        raise ValueError("Unsupported import format; send text/csv or application/x-ndjson") from None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[_Record]:
+    header: Optional[list[str]] = None
+    row = 0
+    record = ""
+    async for line in lines:
+        record = f"{record}\n{line}" if record else line
+        # An odd quote count means a quoted field continues on the next line.
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) > len(header):
+            yield _Record(row, error="Row has more values than the header")
+            continue
+        yield _Record(row, data={name: value for name, value in zip(header, values) if value != ""})
+    if record:
+        yield _Record(row + 1, error="Unterminated quoted field")
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[_Record]:
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield _Record(row, data=json.loads(line))
+        except json.JSONDecodeError as exc:
+            yield _Record(row, error=f"Invalid JSON: {exc.msg}")
+
+
+def _validate(record: _Record, gym_id: int) -> dict[str, Any]:
+    """Return insert values for ``record``; raises ``_RowError`` with the messages to report."""
+    if record.error is not None:
+        raise _RowError([record.error])
+    try:
+        customer_in = schemas.CustomerCreate.model_validate(record.data)
+    except ValidationError as exc:
+        raise _RowError(
+            [f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()]
+        ) from exc
+
+    # Every row carries the full column set so the batch compiles to one multi-row INSERT.
+    values = customer_in.model_dump()
+    values["active"] = values["active"] is not False and not is_membership_expired(values["membership_end"])
+    values["gym_id"] = gym_id
+    return values
+
+
+async def import_customers(
+    session: AsyncSession,
+    gym: models.Gym,
+    chunks: AsyncIterator[bytes],
+    import_format: ImportFormat,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    send_welcome: bool = False,
+    router: ShardRouter = shard_router,
+) -> schemas.CustomerImportResult:
+    """Import customers for ``gym`` from a stream of CSV or NDJSON bytes.
+
+    Valid rows are inserted and committed every ``batch_size`` rows; invalid rows
+    are skipped and reported. With ``send_welcome``, welcome emails for each batch
+    are queued in the email outbox in the same transaction as its rows.
+    """
+    parse = _csv_records if import_format == "csv" else _ndjson_records
+    result = schemas.CustomerImportResult(imported=0, failed=0, errors=[])
+    batch: list[dict[str, Any]] = []
+
+    async def flush() -> None:
+        if not batch:
+            return
+        for values, customer_id in zip(batch, await router.allocate_customer_ids(session, len(batch))):
+            values["id"] = customer_id
+        await session.execute(insert(models.Customer), batch)
+        if send_welcome:
+            await email_outbox.enqueue_emails(
+                session,
+                [(values["email"], *welcome_message(gym, values["first_name"])) for values in batch],
+            )
+        await session.commit()
+        result.imported += len(batch)
+        batch.clear()
+
+    async for record in parse(_iter_lines(chunks)):
+        try:
+            batch.append(_validate(record, gym.id))
+        except _RowError as exc:
+            result.failed += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                result.errors.append(schemas.CustomerImportRowError(row=record.row, errors=exc.messages))
+            else:
+                result.errors_truncated = True
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+
+    await flush()
+    return result
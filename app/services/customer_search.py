@@ -0,0 +1,106 @@
+"""Pluggable search backends for customer name/email filters.
+
+Each backend narrows a ``Select`` over ``models.Customer`` and can optionally
+order it by relevance. The backend is chosen per session dialect so SQLite
+uses its FTS5 trigram table, Postgres its ``pg_trgm`` indexes, and anything
+else falls back to ``ILIKE`` scans.
+"""
+
+from sqlalchemy import Select, column, func, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.search import SEARCH_COLUMNS, SQLITE_FTS_TABLE
+from app.domain import models
+
+# Trigram indexes cannot answer terms shorter than one trigram.
+MIN_TRIGRAM_TERM_LENGTH = 3
+
+
+def _like_pattern(term: str) -> str:
+    return f"%{term}%"
+
+
+class CustomerSearchBackend:
+    """Adapter interface for customer text search."""
+
+    def search(self, stmt: Select, term: str, *, rank: bool = False) -> Select:
+        """Restrict ``stmt`` to customers whose name or email contains ``term``."""
+        raise NotImplementedError  # pragma: no cover - interface definition
+
+    def filter_field(self, stmt: Select, field: str, term: str) -> Select:
+        """Restrict ``stmt`` to customers whose ``field`` contains ``term``."""
+        raise NotImplementedError  # pragma: no cover - interface definition
+
+
+class LikeSearchBackend(CustomerSearchBackend):
+    """Portable backend using ``ILIKE '%term%'``; relevance ranking is not supported."""
+
+    def search(self, stmt: Select, term: str, *, rank: bool = False) -> Select:
+        pattern = _like_pattern(term)
+        return stmt.where(or_(*(getattr(models.Customer, name).ilike(pattern) for name in SEARCH_COLUMNS)))
+
+    def filter_field(self, stmt: Select, field: str, term: str) -> Select:
+        return stmt.where(getattr(models.Customer, field).ilike(_like_pattern(term)))
+
+
+class SQLiteFTSSearchBackend(LikeSearchBackend):
+    """Backend querying the FTS5 trigram shadow table maintained by ``app.db.search``."""
+
+    _fts = table(SQLITE_FTS_TABLE, column("rowid"), column("rank"))
+
+    def search(self, stmt: Select, term: str, *, rank: bool = False) -> Select:
+        if len(term) < MIN_TRIGRAM_TERM_LENGTH:
+            return super().search(stmt, term, rank=rank)
+        return self._join_matches(stmt, self._phrase(term), rank=rank)
+
+    def filter_field(self, stmt: Select, field: str, term: str) -> Select:
+        if len(term) < MIN_TRIGRAM_TERM_LENGTH:
+            return super().filter_field(stmt, field, term)
+        return self._join_matches(stmt, f"{field} : {self._phrase(term)}", rank=False)
+
+    def _join_matches(self, stmt: Select, query: str, *, rank: bool) -> Select:
+        hits = (
+            select(self._fts.c.rowid, self._fts.c.rank)
+            .where(literal_column(SQLITE_FTS_TABLE).op("MATCH")(query))
+            .subquery()
+        )
+        stmt = stmt.join(hits, hits.c.rowid == models.Customer.id)
+        if rank:
+            # FTS5 rank is bm25, where lower is a better match.
+            stmt = stmt.order_by(hits.c.rank)
+        return stmt
+
+    @staticmethod
+    def _phrase(term: str) -> str:
+        escaped = term.replace('"', '""')
+        return f'"{escaped}"'
+
+
+class PostgresTrigramSearchBackend(LikeSearchBackend):
+    """Backend relying on ``pg_trgm`` GIN indexes, which accelerate ``ILIKE '%term%'`` directly."""
+
+    def search(self, stmt: Select, term: str, *, rank: bool = False) -> Select:
+        stmt = super().search(stmt, term, rank=rank)
+        if rank:
+            similarity = func.greatest(
+                *(func.similarity(getattr(models.Customer, name), term) for name in SEARCH_COLUMNS)
+            )
+            stmt = stmt.order_by(similarity.desc())
+        return stmt
+
+
+_BACKENDS: dict[str, CustomerSearchBackend] = {
+    "like": LikeSearchBackend(),
+    "fts5": SQLiteFTSSearchBackend(),
+    "trigram": PostgresTrigramSearchBackend(),
+}
+_DIALECT_BACKENDS = {"sqlite": "fts5", "postgresql": "trigram"}
+
+
+def get_search_backend(session: AsyncSession) -> CustomerSearchBackend:
+    """Return the backend named by ``CUSTOMER_SEARCH_BACKEND``, or the dialect default for ``auto``."""
+    name = get_settings().customer_search_backend.lower().strip()
+    if name == "auto":
+        name = _DIALECT_BACKENDS.get(session.get_bind().dialect.name, "like")
+    return _BACKENDS.get(name, _BACKENDS["like"])
@@ -0,0 +1,91 @@
+"""Dashboard statistics for a gym's customers, aggregated in a single query."""
+
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import ColumnElement, and_, func, not_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain import models, schemas
+from app.services.customers import current_date, effectively_active, filter_customers, years_ago
+
+EXPIRY_WINDOWS_DAYS = (7, 30)
+
+# (field, youngest age included, youngest age excluded); None leaves the band open-ended.
+AGE_BANDS: tuple[tuple[str, int, Optional[int]], ...] = (
+    ("under_18", 0, 18),
+    ("age_18_29", 18, 30),
+    ("age_30_44", 30, 45),
+    ("age_45_64", 45, 65),
+    ("age_65_plus", 65, None),
+)
+
+
+def _age_band(min_age: int, max_age_exclusive: Optional[int]) -> ColumnElement[bool]:
+    # Someone is at least `min_age` if born on or before that many years ago.
+    condition = models.Customer.date_of_birth <= years_ago(min_age)
+    if max_age_exclusive is not None:
+        condition = and_(condition, models.Customer.date_of_birth > years_ago(max_age_exclusive))
+    return condition
+
+
+def _count_where(condition: ColumnElement[bool]) -> ColumnElement[int]:
+    return func.count().filter(condition)
+
+
+async def customer_stats(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    active: Optional[bool] = None,
+    search: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+) -> schemas.CustomerStats:
+    """Count ``gym_id``'s customers matching the list filters, broken down for the dashboard.
+
+    Every figure is a filtered ``COUNT`` in one ``SELECT``, so the whole document
+    costs one round trip regardless of gym size.
+    """
+    today = current_date()
+    is_active = effectively_active(today)
+    columns = [
+        func.count().label("total"),
+        _count_where(is_active).label("active"),
+        _count_where(not_(is_active)).label("inactive"),
+        *(
+            _count_where(
+                and_(is_active, models.Customer.membership_end <= today + timedelta(days=days))
+            ).label(f"expiring_within_{days}_days")
+            for days in EXPIRY_WINDOWS_DAYS
+        ),
+        *(_count_where(_age_band(low, high)).label(name) for name, low, high in AGE_BANDS),
+        _count_where(models.Customer.date_of_birth.is_(None)).label("unknown"),
+    ]
+    stmt = filter_customers(
+        select(*columns).where(models.Customer.gym_id == gym_id),
+        session,
+        active=active,
+        search=search,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        min_age=min_age,
+        max_age=max_age,
+    )
+    row = (await session.execute(stmt)).one()._mapping
+
+    return schemas.CustomerStats(
+        total=row["total"],
+        active=row["active"],
+        inactive=row["inactive"],
+        expiring_within_7_days=row["expiring_within_7_days"],
+        expiring_within_30_days=row["expiring_within_30_days"],
+        age_bands=schemas.CustomerAgeBands(
+            **{name: row[name] for name, _, _ in AGE_BANDS},
+            unknown=row["unknown"],
+        ),
+    )
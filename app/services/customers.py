@@ -1,20 +1,33 @@
-﻿import asyncio
-from datetime import date
-from typing import Iterable, Optional, Callable, Any
-
-from sqlalchemy import or_, select
+﻿import base64
+import binascii
+import json
+from datetime import date, datetime
+from collections.abc import Sequence
+from typing import Literal, Optional, Any
+
+import pydantic_core
+from sqlalchemy import ColumnElement, Row, Select, and_, case, insert, not_, or_, select, tuple_
+from sqlalchemy import update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.mailer import get_mailer
+from app.db.session import shard_router
+from app.db.sharding import ShardRouter
 from app.domain import models, schemas
+from app.services import email_outbox
+from app.services.customer_search import get_search_backend
+
+CustomerSort = Literal["created_at", "relevance"]
 
+CUSTOMER_FIELDS = tuple(schemas.CustomerOut.model_fields)
 
-def _today() -> date:
+
+def current_date() -> date:
     return date.today()
 
 
-def _years_ago(years: int) -> date:
-    today = _today()
+def years_ago(years: int) -> date:
+    today = current_date()
     try:
         return today.replace(year=today.year - years)
     except ValueError:
@@ -22,40 +35,77 @@ def _years_ago(years: int) -> date:
         return today.replace(month=2, day=28, year=today.year - years)
 
 
-async def _deactivate_if_expired(customers: Iterable[models.Customer], session: AsyncSession) -> None:
-    today = _today()
-    changed = False
-    expired_ids: list[int] = []
-    for customer in customers:
-        if customer.membership_end and customer.membership_end < today and customer.active:
-            customer.active = False
-            session.add(customer)
-            changed = True
-            expired_ids.append(customer.id)
-    if changed:
-        await session.commit()
-        for customer in customers:
-            if customer.id in expired_ids:
-                await session.refresh(customer)
+def encode_cursor(customer: models.Customer) -> str:
+    """Return an opaque keyset cursor pointing just past ``customer`` in list order."""
+    payload = json.dumps({"created_at": customer.created_at.isoformat(), "id": customer.id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
 
-async def create_customer(
-    session: AsyncSession,
-    gym: models.Gym,
-    customer_in: schemas.CustomerCreate,
-    schedule_mail: Callable[[Callable[..., Any], Any, Any], Any] | None = None,
-) -> models.Customer:
-    customer = models.Customer(
-        gym_id=gym.id,
-        **customer_in.model_dump(exclude_unset=True),
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by :func:`encode_cursor` into its ``(created_at, id)`` key."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def membership_lapsed(today: Optional[date] = None) -> ColumnElement[bool]:
+    """SQL predicate for customers whose membership ended before ``today``."""
+    return models.Customer.membership_end < (today or current_date())
+
+
+def effectively_active(today: Optional[date] = None) -> ColumnElement[bool]:
+    """SQL predicate for customers that are active and whose membership has not ended."""
+    today = today or current_date()
+    return and_(
+        models.Customer.active.is_(True),
+        or_(models.Customer.membership_end.is_(None), models.Customer.membership_end >= today),
     )
-    session.add(customer)
-    await session.commit()
-    await session.refresh(customer)
 
-    mailer = get_mailer()
+
+def _present_effective_status(customers: list[models.Customer]) -> None:
+    """Report lapsed memberships as inactive without marking the rows dirty.
+
+    Bridges the window between a membership ending and the sweeper persisting it,
+    so reads stay consistent with the SQL ``active`` filter and never write.
+    """
+    today = current_date()
+    for customer in customers:
+        if customer.active and customer.membership_end and customer.membership_end < today:
+            set_committed_value(customer, "active", False)
+
+
+def is_membership_expired(membership_end: Optional[date]) -> bool:
+    return membership_end is not None and membership_end < current_date()
+
+
+def _apply_expiry(values: dict[str, Any]) -> dict[str, Any]:
+    """Make ``INSERT`` values store a lapsed membership as inactive.
+
+    Only used on write paths so the flag is persisted by the same statement; reads
+    rely on :func:`deactivate_expired_memberships` running in the background.
+    """
+    if values.get("active", True) and is_membership_expired(values.get("membership_end")):
+        values["active"] = False
+    return values
+
+
+def _apply_expiry_update(values: dict[str, Any]) -> dict[str, Any]:
+    """``UPDATE`` counterpart of :func:`_apply_expiry`, judged against the row's stored values."""
+    if "membership_end" in values:
+        if is_membership_expired(values["membership_end"]):
+            values["active"] = False
+    elif values.get("active", True):
+        values["active"] = case((membership_lapsed(), False), else_=values.get("active", models.Customer.active))
+    return values
+
+
+def welcome_message(gym: models.Gym, first_name: str) -> tuple[str, str]:
+    """Return the ``(subject, body)`` of the welcome email for a new customer of ``gym``."""
     gym_name = gym.name or "our gym"
     body_lines = [
-        f"Hi {customer.first_name},",
+        f"Hi {first_name},",
         "",
         f"Welcome to {gym_name}. We're excited to see you in the club!",
         "Here's what you can do next:",
@@ -66,23 +116,53 @@ async def create_customer(
         "See you soon!",
         f"{gym_name} Team",
     ]
-    if schedule_mail:
-        maybe_task = schedule_mail(mailer.send, customer.email, f"Welcome to {gym_name}!", "\n".join(body_lines))
-        if asyncio.iscoroutine(maybe_task) or isinstance(maybe_task, asyncio.Task):
-            await maybe_task
-    else:
-        await mailer.send(
-            to=customer.email,
-            subject=f"Welcome to {gym_name}!",
-            body="\n".join(body_lines),
+    return f"Welcome to {gym_name}!", "\n".join(body_lines)
+
+
+async def deactivate_expired_memberships(session: AsyncSession, today: Optional[date] = None) -> int:
+    """Deactivate every active customer whose membership ended before ``today``.
+
+    Runs one set-based ``UPDATE`` per gym, committing after each so locks stay
+    short on large tenants. Returns the number of rows deactivated.
+    """
+    today = today or current_date()
+    expired = (
+        models.Customer.active.is_(True),
+        models.Customer.membership_end.is_not(None),
+        models.Customer.membership_end < today,
+    )
+    gym_ids = (await session.scalars(select(models.Customer.gym_id).where(*expired).distinct())).all()
+
+    deactivated = 0
+    for gym_id in gym_ids:
+        result = await session.execute(
+            sa_update(models.Customer)
+            .where(models.Customer.gym_id == gym_id, *expired)
+            .values(active=False, updated_at=models.utcnow())
+            .execution_options(synchronize_session=False)
         )
+        await session.commit()
+        deactivated += result.rowcount or 0
+    return deactivated
 
+
+async def create_customer(
+    session: AsyncSession,
+    gym: models.Gym,
+    customer_in: schemas.CustomerCreate,
+    router: ShardRouter = shard_router,
+) -> models.Customer:
+    (customer_id,) = await router.allocate_customer_ids(session, 1)
+    values = _apply_expiry({"id": customer_id, "gym_id": gym.id, **customer_in.model_dump(exclude_unset=True)})
+    customer = await session.scalar(insert(models.Customer).values(values).returning(models.Customer))
+    await email_outbox.enqueue_email(session, customer.email, *welcome_message(gym, customer.first_name))
+    await session.commit()
     return customer
 
 
-async def list_customers(
+def filter_customers(
+    stmt: Select,
     session: AsyncSession,
-    gym_id: int,
     *,
     active: Optional[bool] = None,
     search: Optional[str] = None,
@@ -91,55 +171,170 @@ async def list_customers(
     email: Optional[str] = None,
     min_age: Optional[int] = None,
     max_age: Optional[int] = None,
-    limit: int = 50,
-    offset: int = 0,
-) -> list[models.Customer]:
+    rank: bool = False,
+) -> Select:
+    """Apply the ``list_customers`` filter set to ``stmt``, a select over ``customers``.
+
+    Raises ``ValueError`` for contradictory filters. ``rank`` orders ``search``
+    matches by relevance where the search backend supports it.
+    """
     if min_age is not None and max_age is not None and min_age > max_age:
         raise ValueError("min_age cannot be greater than max_age")
 
-    stmt = select(models.Customer).where(models.Customer.gym_id == gym_id)
-
     if active is not None:
-        stmt = stmt.where(models.Customer.active == active)
-
-    def _ilike(value: str) -> str:
-        return f"%{value}%"
+        is_active = effectively_active()
+        stmt = stmt.where(is_active if active else not_(is_active))
 
+    search_backend = get_search_backend(session)
     if search:
-        pattern = _ilike(search)
-        stmt = stmt.where(
-            or_(
-                models.Customer.first_name.ilike(pattern),
-                models.Customer.last_name.ilike(pattern),
-                models.Customer.email.ilike(pattern),
-            )
-        )
-
-    if first_name:
-        stmt = stmt.where(models.Customer.first_name.ilike(_ilike(first_name)))
-
-    if last_name:
-        stmt = stmt.where(models.Customer.last_name.ilike(_ilike(last_name)))
-
-    if email:
-        stmt = stmt.where(models.Customer.email.ilike(_ilike(email)))
+        stmt = search_backend.search(stmt, search, rank=rank)
+    for field, term in (("first_name", first_name), ("last_name", last_name), ("email", email)):
+        if term:
+            stmt = search_backend.filter_field(stmt, field, term)
 
     if min_age is not None:
-        min_dob = _years_ago(min_age)
+        min_dob = years_ago(min_age)
         stmt = stmt.where(models.Customer.date_of_birth <= min_dob)
 
     if max_age is not None:
-        max_dob = _years_ago(max_age)
+        max_dob = years_ago(max_age)
         stmt = stmt.where(models.Customer.date_of_birth >= max_dob)
 
-    stmt = stmt.order_by(models.Customer.created_at.desc()).limit(limit).offset(offset)
-    result = await session.execute(stmt)
-    customers: list[models.Customer] = list(result.scalars().all())
+    return stmt
 
-    await _deactivate_if_expired(customers, session)
+
+def build_list_query(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    active: Optional[bool] = None,
+    search: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sort: CustomerSort = "created_at",
+    columns: Optional[Sequence[ColumnElement[Any]]] = None,
+) -> Select:
+    """Build the ``SELECT`` behind :func:`list_customers` without executing it.
+
+    ``columns`` projects the listing onto those columns instead of loading entities.
+    """
+    if cursor is not None and offset:
+        raise ValueError("cursor and offset cannot be combined")
+    if sort == "relevance" and not search:
+        raise ValueError("sort=relevance requires search")
+    if sort == "relevance" and cursor is not None:
+        raise ValueError("cursor pagination is not supported with sort=relevance")
+
+    base = select(*columns) if columns is not None else select(models.Customer)
+    stmt = filter_customers(
+        base.where(models.Customer.gym_id == gym_id),
+        session,
+        active=active,
+        search=search,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        min_age=min_age,
+        max_age=max_age,
+        rank=sort == "relevance",
+    )
+
+    if cursor is not None:
+        # Keyset pagination: seek past the last row of the previous page via the
+        # listing index instead of scanning and discarding `offset` rows.
+        created_at, customer_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(models.Customer.created_at, models.Customer.id) < (created_at, customer_id))
+
+    stmt = stmt.order_by(models.Customer.created_at.desc(), models.Customer.id.desc()).limit(limit)
+    if offset:
+        stmt = stmt.offset(offset)
+    return stmt
+
+
+async def list_customers(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    active: Optional[bool] = None,
+    search: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sort: CustomerSort = "created_at",
+) -> list[models.Customer]:
+    stmt = build_list_query(
+        session,
+        gym_id,
+        active=active,
+        search=search,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        min_age=min_age,
+        max_age=max_age,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        sort=sort,
+    )
+    result = await session.execute(stmt)
+    customers = list(result.scalars().all())
+    _present_effective_status(customers)
     return customers
 
 
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    """Parse a comma-separated sparse fieldset; ``None`` selects every ``CustomerOut`` field."""
+    if fields is None:
+        return CUSTOMER_FIELDS
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in CUSTOMER_FIELDS]
+    if unknown or not requested:
+        raise ValueError(f"Unknown or empty fields: {', '.join(unknown)}; allowed: {', '.join(CUSTOMER_FIELDS)}")
+    return requested
+
+
+def _field_column(name: str) -> ColumnElement[Any]:
+    if name == "active":
+        return effectively_active().label("active")
+    return getattr(models.Customer, name)
+
+
+async def list_customer_rows(
+    session: AsyncSession,
+    gym_id: int,
+    *,
+    fields: Sequence[str] = CUSTOMER_FIELDS,
+    **query: Any,
+) -> list[Row]:
+    """Fast listing path: the :func:`list_customers` page as plain rows of ``fields``.
+
+    Only the requested columns are selected and rows bypass the ORM identity map.
+    ``id`` and ``created_at`` are always selected so the caller can build a cursor.
+    Accepts the same keyword arguments as :func:`list_customers`.
+    """
+    names = tuple(dict.fromkeys(("id", "created_at", *fields)))
+    stmt = build_list_query(session, gym_id, columns=[_field_column(name) for name in names], **query)
+    result = await session.execute(stmt)
+    return list(result.all())
+
+
+def rows_to_json(rows: Sequence[Row], fields: Sequence[str] = CUSTOMER_FIELDS) -> bytes:
+    """Serialize rows from :func:`list_customer_rows` to a JSON array of ``fields`` objects."""
+    return pydantic_core.to_json([{name: row._mapping[name] for name in fields} for row in rows])
+
+
 async def get_customer(
     session: AsyncSession,
     gym_id: int,
@@ -148,8 +343,7 @@ async def get_customer(
     customer = await session.get(models.Customer, customer_id)
     if customer is None or customer.gym_id != gym_id:
         return None
-
-    await _deactivate_if_expired([customer], session)
+    _present_effective_status([customer])
     return customer
 
 
@@ -159,19 +353,19 @@ async def update_customer(
     customer_id: int,
     update: schemas.CustomerUpdate,
 ) -> Optional[models.Customer]:
-    customer = await get_customer(session, gym_id, customer_id)
-    if customer is None:
-        return None
-
-    updates = update.model_dump(exclude_unset=True)
-    if updates:
-        for key, value in updates.items():
-            setattr(customer, key, value)
-        session.add(customer)
-        await session.commit()
-        await session.refresh(customer)
-
-    await _deactivate_if_expired([customer], session)
+    values = update.model_dump(exclude_unset=True)
+    if not values:
+        return await get_customer(session, gym_id, customer_id)
+
+    stmt = (
+        sa_update(models.Customer)
+        .where(models.Customer.id == customer_id, models.Customer.gym_id == gym_id)
+        .values(_apply_expiry_update(values))
+        .returning(models.Customer)
+        .execution_options(populate_existing=True)
+    )
+    customer = await session.scalar(stmt)
+    await session.commit()
     return customer
 
 
@@ -0,0 +1,146 @@
+"""Transactional email outbox.
+
+Mail is queued as ``email_outbox`` rows inside the transaction of the write that
+triggers it, so it is sent if and only if that write commits, and requests never
+wait on SMTP. ``app.workers.email_outbox`` drains the table in batches.
+
+A batch is claimed with one ``UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP
+LOCKED) RETURNING`` that pushes ``available_at`` out by a lease. On Postgres,
+concurrent drainers skip each other's locked rows. SQLite has no row locks (the
+``FOR UPDATE`` clause is not rendered there), but it runs one writer at a time
+and refuses writes from a stale snapshot, so the same statement claims each row
+once. A drainer that dies mid-batch only delays its rows until the lease ends.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import Row, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.mailer import Mailer
+from app.core.metrics import EMAIL_OUTBOX_DELIVERIES_TOTAL
+from app.domain import models
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+_Outbox = models.EmailOutbox
+
+
+@dataclass
+class DrainResult:
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+async def enqueue_emails(session: AsyncSession, messages: Iterable[tuple[str, str, str]]) -> None:
+    """Queue ``(to, subject, body)`` messages in ``session``'s transaction; the caller commits."""
+    rows = [{"recipient": to, "subject": subject, "body": body} for to, subject, body in messages]
+    if rows:
+        await session.execute(insert(_Outbox), rows)
+
+
+async def enqueue_email(session: AsyncSession, to: str, subject: str, body: str) -> None:
+    await enqueue_emails(session, [(to, subject, body)])
+
+
+async def claim_batch(session: AsyncSession, batch_size: int, lease_seconds: float) -> list[Row]:
+    """Claim up to ``batch_size`` due rows for ``lease_seconds`` and commit the claim."""
+    now = models.utcnow()
+    due = (
+        select(_Outbox.id)
+        .where(_Outbox.status == PENDING, _Outbox.available_at <= now)
+        .order_by(_Outbox.available_at, _Outbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        update(_Outbox)
+        .where(_Outbox.id.in_(due))
+        .values(available_at=now + timedelta(seconds=lease_seconds), attempts=_Outbox.attempts + 1)
+        .returning(_Outbox.id, _Outbox.recipient, _Outbox.subject, _Outbox.body, _Outbox.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    await session.commit()
+    return rows
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.email_outbox_retry_delay_seconds * 2 ** (attempts - 1))
+
+
+async def drain_batch(
+    session: AsyncSession,
+    mailer: Mailer,
+    *,
+    batch_size: Optional[int] = None,
+    lease_seconds: Optional[float] = None,
+) -> DrainResult:
+    """Claim one batch, send it and record the outcome of every row.
+
+    Failed sends are retried with exponential backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS``,
+    then left as ``failed`` with the last error.
+    """
+    rows = await claim_batch(
+        session,
+        batch_size or settings.email_outbox_batch_size,
+        lease_seconds or settings.email_outbox_lease_seconds,
+    )
+    result = DrainResult(claimed=len(rows))
+    # Sends run concurrently, up to what the mailer can use (the SMTP connection pool size).
+    slots = asyncio.Semaphore(mailer.max_concurrency)
+    # Each outcome is committed as soon as it is known, so a drainer that dies mid-batch only
+    # re-sends the mails that were in flight. The lock serializes use of the one session.
+    writes = asyncio.Lock()
+
+    async def record(outbox_id: int, values: dict) -> None:
+        async with writes:
+            await session.execute(update(_Outbox).where(_Outbox.id == outbox_id).values(**values))
+            await session.commit()
+
+    async def deliver(row: Row) -> None:
+        async with slots:
+            try:
+                await mailer.send(row.recipient, row.subject, row.body)
+            except Exception as exc:
+                logger.warning("Sending outbox mail %d to %s failed: %s", row.id, row.recipient, exc)
+                values = {"last_error": str(exc)}
+                if row.attempts >= settings.email_outbox_max_attempts:
+                    values["status"] = FAILED
+                    result.failed += 1
+                else:
+                    values["available_at"] = models.utcnow() + _retry_delay(row.attempts)
+                    result.retried += 1
+            else:
+                values = {"status": SENT, "sent_at": models.utcnow()}
+                result.sent += 1
+            await record(row.id, values)
+
+    await asyncio.gather(*(deliver(row) for row in rows))
+
+    EMAIL_OUTBOX_DELIVERIES_TOTAL.labels(result="sent").inc(result.sent)
+    EMAIL_OUTBOX_DELIVERIES_TOTAL.labels(result="retry").inc(result.retried)
+    EMAIL_OUTBOX_DELIVERIES_TOTAL.labels(result="failed").inc(result.failed)
+    return result
+
+
+async def purge_sent(session: AsyncSession, retention_hours: Optional[float] = None) -> int:
+    """Delete rows sent more than ``retention_hours`` ago; returns the number removed."""
+    hours = settings.email_outbox_retention_hours if retention_hours is None else retention_hours
+    cutoff = models.utcnow() - timedelta(hours=hours)
+    result = await session.execute(delete(_Outbox).where(_Outbox.status == SENT, _Outbox.sent_at < cutoff))
+    await session.commit()
+    return result.rowcount or 0
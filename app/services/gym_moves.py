@@ -0,0 +1,66 @@
+"""Offline move of one gym's rows from its shard to another.
+
+Meant to run while the gym receives no writes. Rows are copied to the target
+shard in one transaction, then the directory is switched, and only then are the
+source rows deleted, so every step leaves a complete copy that the directory
+points at. Primary keys are kept: gym and customer ids are allocated by the
+shard directory, so they never collide with rows already on the target.
+"""
+
+import logging
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db.sharding import ShardRouter
+from app.domain import models
+
+logger = logging.getLogger(__name__)
+
+GYMS = models.Gym.__table__
+CUSTOMERS = models.Customer.__table__
+
+
+async def move_gym(router: ShardRouter, gym_id: int, target: str, batch_size: int = 1000) -> int:
+    """Move gym ``gym_id`` and its customers to shard ``target``. Returns the number of customers moved."""
+    if target not in router.engines:
+        raise ValueError(f"Unknown shard: {target}")
+    router.placements.invalidate(gym_id)
+    source = await router.shard_for_gym(gym_id)
+    if source is None:
+        raise ValueError(f"Gym {gym_id} is not in the shard directory")
+    if source == target:
+        raise ValueError(f"Gym {gym_id} is already on shard {target}")
+
+    moved = 0
+    async with router.session(source) as source_session, router.session(target) as target_session:
+        gym_row = (await source_session.execute(select(GYMS).where(GYMS.c.id == gym_id))).mappings().first()
+        if gym_row is None:
+            raise ValueError(f"Gym {gym_id} has no rows on shard {source}")
+        try:
+            await target_session.execute(insert(GYMS), [dict(gym_row)])
+            rows = await source_session.stream(
+                select(CUSTOMERS).where(CUSTOMERS.c.gym_id == gym_id).order_by(CUSTOMERS.c.id)
+            )
+            async for batch in rows.mappings().partitions(batch_size):
+                await target_session.execute(insert(CUSTOMERS), [dict(row) for row in batch])
+                moved += len(batch)
+            await target_session.commit()
+        except IntegrityError as exc:
+            await target_session.rollback()
+            raise ValueError(f"Gym {gym_id} conflicts with existing rows on shard {target}") from exc
+
+    async with router.session() as directory:
+        await directory.execute(
+            update(models.GymShard).where(models.GymShard.gym_id == gym_id).values(shard=target)
+        )
+        await directory.commit()
+    router.placements.set(gym_id, target)
+
+    async with router.session(source) as source_session:
+        await source_session.execute(delete(CUSTOMERS).where(CUSTOMERS.c.gym_id == gym_id))
+        await source_session.execute(delete(GYMS).where(GYMS.c.id == gym_id))
+        await source_session.commit()
+
+    logger.info("Moved gym %d with %d customers from shard %s to %s", gym_id, moved, source, target)
+    return moved
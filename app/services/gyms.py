@@ -1,7 +1,57 @@
-﻿from sqlalchemy import select
+﻿import logging
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy import update as sa_update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.db.session import shard_router
+from app.db.sharding import ShardRouter
 from app.domain import models, schemas
+from app.services import customer_bulk
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Column snapshots of authenticated gyms, so most requests authenticate without a query.
+# Snapshots (not ORM instances) are cached because an instance can belong to one session only.
+principal_cache: TTLCache[int, dict[str, Any]] = TTLCache(
+    "gym_principal",
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+)
+
+
+def _snapshot(gym: models.Gym) -> dict[str, Any]:
+    return {attr.key: getattr(gym, attr.key) for attr in inspect(models.Gym).column_attrs}
+
+
+async def get_gym_principal(session: AsyncSession, gym_id: int) -> Optional[models.Gym]:
+    """Return the gym for an authenticated request, from the principal cache when possible.
+
+    Cache hits are attached to ``session`` as persistent instances without a query,
+    so callers can update or delete them exactly like a ``session.get`` result.
+    """
+    if not settings.principal_cache_enabled:
+        return await session.get(models.Gym, gym_id)
+
+    snapshot = principal_cache.get(gym_id)
+    if snapshot is None:
+        gym = await session.get(models.Gym, gym_id)
+        if gym is not None:
+            principal_cache.set(gym_id, _snapshot(gym))
+        return gym
+
+    gym = models.Gym(**snapshot)
+    make_transient_to_detached(gym)
+    session.add(gym)
+    return gym
 
 
 async def update_gym(
@@ -9,24 +59,146 @@ async def update_gym(
     gym: models.Gym,
     update: schemas.GymUpdate,
 ) -> models.Gym:
-    updates = update.model_dump(exclude_unset=True)
-    if updates:
-        for key, value in updates.items():
-            setattr(gym, key, value)
-        session.add(gym)
+    values = update.model_dump(exclude_unset=True)
+    if values:
+        stmt = (
+            sa_update(models.Gym)
+            .where(models.Gym.id == gym.id)
+            .values(values)
+            .returning(models.Gym)
+            .execution_options(populate_existing=True)
+        )
+        gym = await session.scalar(stmt)
         await session.commit()
-        await session.refresh(gym)
+        principal_cache.invalidate(gym.id)
     return gym
 
 
-async def delete_gym(session: AsyncSession, gym: models.Gym) -> None:
-    # Explicitly remove customers to ensure consistency across backends (e.g., SQLite without FK cascades).
-    result = await session.execute(
-        select(models.Customer).where(models.Customer.gym_id == gym.id)
+async def is_large_gym(session: AsyncSession, gym_id: int) -> bool:
+    """Whether ``gym_id`` has more than ``GYM_DELETE_SYNC_MAX_CUSTOMERS`` customers.
+
+    Probes one row past the limit instead of counting, so the check stays cheap for huge gyms.
+    """
+    stmt = (
+        select(models.Customer.id)
+        .where(models.Customer.gym_id == gym_id)
+        .offset(settings.gym_delete_sync_max_customers)
+        .limit(1)
     )
-    customers = result.scalars().all()
-    for customer in customers:
-        await session.delete(customer)
+    return await session.scalar(stmt) is not None
+
 
+async def delete_gym(
+    session: AsyncSession,
+    gym: models.Gym,
+    router: ShardRouter = shard_router,
+    *,
+    on_chunk: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> int:
+    """Delete ``gym`` and its customers; returns the number of customers deleted.
+
+    Customers go in committed chunks of ``GYM_DELETE_CHUNK_SIZE`` (SQLite does not enforce
+    the FK cascade, and one huge transaction is what we want to avoid on Postgres). The gym
+    row goes last, together with anything inserted while the chunks ran.
+    """
+    deleted = await customer_bulk.delete_gym_customers(
+        session, gym.id, chunk_size=settings.gym_delete_chunk_size, on_chunk=on_chunk
+    )
+    result = await session.execute(
+        delete(models.Customer)
+        .where(models.Customer.gym_id == gym.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted += result.rowcount or 0
     await session.delete(gym)
-    await session.commit()
+    if router.is_sharded:
+        # The directory is another database. Committing the gym delete first means a failure
+        # in between only leaves the email reserved, never a gym row that no token can reach.
+        await session.commit()
+        await router.unregister_gym(session, gym.id)
+    else:
+        await router.unregister_gym(session, gym.id)
+        await session.commit()
+    principal_cache.invalidate(gym.id)
+    return deleted
+
+
+async def start_gym_deletion(
+    session: AsyncSession,
+    gym: models.Gym,
+    router: ShardRouter = shard_router,
+) -> tuple[models.GymDeletion, bool]:
+    """Record a pending background deletion of ``gym``; run it with ``run_gym_deletion``.
+
+    Returns ``(deletion, started)``. While an earlier deletion of the gym is still pending or
+    running, that one is returned with ``started`` false, so two runs never race on one gym.
+    Background runs die with their worker, so an unfinished deletion without a heartbeat
+    for ``GYM_DELETE_LEASE_SECONDS`` is marked failed and a new run is started instead.
+    """
+    unfinished_filter = (
+        models.GymDeletion.gym_id == gym.id,
+        models.GymDeletion.status.in_(("pending", "running")),
+    )
+    last_seen = func.coalesce(models.GymDeletion.heartbeat_at, models.GymDeletion.created_at)
+    cutoff = models.utcnow() - timedelta(seconds=settings.gym_delete_lease_seconds)
+    async with router.directory(session) as directory:
+        await directory.execute(
+            sa_update(models.GymDeletion)
+            .where(*unfinished_filter, last_seen < cutoff)
+            .values(status="failed", error="Abandoned: no progress within the lease", finished_at=models.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        unfinished = await directory.scalar(
+            select(models.GymDeletion)
+            .where(*unfinished_filter)
+            .order_by(models.GymDeletion.created_at.desc())
+            .limit(1)
+        )
+        if unfinished is not None:
+            return unfinished, False
+        deletion = models.GymDeletion(id=uuid.uuid4().hex, gym_id=gym.id, status="pending", deleted_customers=0)
+        directory.add(deletion)
+        await directory.commit()
+    return deletion, True
+
+
+async def run_gym_deletion(router: ShardRouter, deletion_id: str) -> None:
+    """Background task: delete the gym of ``deletion_id``, recording progress after every chunk.
+
+    A failed run is marked ``failed``; calling ``DELETE /gyms/me`` again starts a new run
+    that picks up where it stopped, since finished chunks stay deleted.
+    """
+    async with router.session() as jobs:
+        deletion = await jobs.get(models.GymDeletion, deletion_id)
+        if deletion is None:
+            return
+        deletion.status = "running"
+        deletion.heartbeat_at = models.utcnow()
+        await jobs.commit()
+
+        async def record_progress(deleted: int) -> None:
+            deletion.deleted_customers = deleted
+            deletion.heartbeat_at = models.utcnow()
+            await jobs.commit()
+
+        try:
+            shard = await router.shard_for_gym(deletion.gym_id)
+            if shard is not None:
+                async with router.session(shard) as session:
+                    gym = await session.get(models.Gym, deletion.gym_id)
+                    if gym is not None:
+                        deletion.deleted_customers = await delete_gym(
+                            session, gym, router, on_chunk=record_progress
+                        )
+        except Exception as exc:
+            logger.exception("Deletion %s of gym %d failed", deletion_id, deletion.gym_id)
+            deletion.status = "failed"
+            deletion.error = str(exc)
+        else:
+            deletion.status = "completed"
+        deletion.finished_at = models.utcnow()
+        await jobs.commit()
+
+
+async def get_gym_deletion(session: AsyncSession, deletion_id: str) -> Optional[models.GymDeletion]:
+    return await session.get(models.GymDeletion, deletion_id)
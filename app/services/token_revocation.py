@@ -0,0 +1,99 @@
+"""Token revocation: a ``revoked_tokens`` table mirrored into an in-process denylist.
+
+Request authentication only consults the in-memory :data:`revoked_tokens`, so checking
+a token costs no query. Revocations made by this process apply immediately; revocations
+made by other workers arrive with the next :func:`sync_revocations`.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain import models
+
+
+class RevocationList:
+    """Set of revoked ``jti`` values, each remembered only until its token expires."""
+
+    def __init__(self) -> None:
+        self._expiry: dict[str, float] = {}
+
+    def __contains__(self, jti: object) -> bool:
+        return jti in self._expiry
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._expiry[jti] = expires_at
+
+    def merge(self, entries: dict[str, float], now: Optional[float] = None) -> None:
+        """Add ``entries`` and forget tokens that have expired since they were revoked."""
+        now = time.time() if now is None else now
+        self._expiry.update(entries)
+        self._expiry = {jti: expires_at for jti, expires_at in self._expiry.items() if expires_at > now}
+
+    def clear(self) -> None:
+        self._expiry.clear()
+
+
+revoked_tokens = RevocationList()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns; they are stored as UTC.
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+async def revoke_token(session: AsyncSession, payload: dict[str, Any]) -> None:
+    """Revoke the token ``payload`` was decoded from. Tokens without a ``jti`` cannot be revoked."""
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or not isinstance(exp, (int, float)):
+        return
+
+    revoked_tokens.add(jti, exp)
+    await session.merge(models.RevokedToken(jti=jti, expires_at=datetime.fromtimestamp(exp, tz=timezone.utc)))
+    await session.commit()
+
+
+async def consume_token(session: AsyncSession, payload: dict[str, Any]) -> bool:
+    """Revoke a single-use token; returns ``False`` if it was already revoked or has no ``jti``.
+
+    Unlike :func:`revoke_token` this is a plain ``INSERT``, so when several requests or
+    workers present the same token at once the primary key lets exactly one of them win.
+    """
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if not jti or not isinstance(exp, (int, float)):
+        return False
+
+    try:
+        await session.execute(
+            insert(models.RevokedToken).values(jti=jti, expires_at=datetime.fromtimestamp(exp, tz=timezone.utc))
+        )
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        return False
+    finally:
+        revoked_tokens.add(jti, exp)
+    return True
+
+
+async def sync_revocations(session: AsyncSession) -> int:
+    """Purge expired rows and load every live revocation into :data:`revoked_tokens`."""
+    now = models.utcnow()
+    await session.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= now))
+    result = await session.execute(
+        select(models.RevokedToken.jti, models.RevokedToken.expires_at).where(models.RevokedToken.expires_at > now)
+    )
+    entries = {jti: _as_utc(expires_at).timestamp() for jti, expires_at in result}
+    await session.commit()
+
+    revoked_tokens.merge(entries, now=now.timestamp())
+    return len(entries)
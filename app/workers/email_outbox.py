@@ -0,0 +1,69 @@
+"""Periodic job that delivers queued mail from the ``email_outbox`` table of every shard.
+
+Runs in-process from the application lifespan, or standalone via
+``python -m app.workers.email_outbox [--once]``. Several drainers may run at once;
+each batch is claimed atomically (see ``app.services.email_outbox``).
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core import mailer as mailer_module
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.db.session import shard_router
+from app.services import email_outbox
+
+logger = logging.getLogger(__name__)
+
+
+async def drain_once() -> int:
+    """Send every due mail, batch by batch, and purge old sent rows. Returns the number sent."""
+    settings = get_settings()
+    mailer = mailer_module.get_mailer()
+    sent = 0
+    for shard in shard_router.engines:
+        async with shard_router.session(shard) as session:
+            while True:
+                result = await email_outbox.drain_batch(session, mailer)
+                sent += result.sent
+                if result.claimed < settings.email_outbox_batch_size:
+                    break
+            await email_outbox.purge_sent(session)
+    if sent:
+        logger.info("Sent %d outbox mails", sent)
+    return sent
+
+
+async def run_forever(interval_seconds: float) -> None:
+    """Drain every ``interval_seconds`` until cancelled; failures are logged and retried next tick."""
+    while True:
+        try:
+            await drain_once()
+        except Exception:
+            logger.exception("Email outbox drain failed")
+        await asyncio.sleep(interval_seconds)
+
+
+async def run(once: bool) -> None:
+    try:
+        if once:
+            await drain_once()
+        else:
+            await run_forever(get_settings().email_outbox_poll_interval_seconds)
+    finally:
+        await mailer_module.close_mailer()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deliver queued mail from the email outbox.")
+    parser.add_argument("--once", action="store_true", help="Drain once and exit.")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(run(args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+﻿"""Periodic job that deactivates customers whose membership has ended.
+
+Runs in-process from the application lifespan, or standalone via
+``python -m app.workers.membership_sweeper [--once]``.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.core.metrics import MEMBERSHIP_SWEEP_DEACTIVATED_TOTAL, MEMBERSHIP_SWEEP_DURATION_SECONDS
+from app.db.session import shard_router
+from app.services import customers as customer_service
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_once() -> int:
+    """Run a single sweep over every shard and record its metrics. Returns the number of rows deactivated."""
+    start_time = time.perf_counter()
+    deactivated = 0
+    for shard in shard_router.engines:
+        async with shard_router.session(shard) as session:
+            deactivated += await customer_service.deactivate_expired_memberships(session)
+    duration = time.perf_counter() - start_time
+
+    MEMBERSHIP_SWEEP_DEACTIVATED_TOTAL.inc(deactivated)
+    MEMBERSHIP_SWEEP_DURATION_SECONDS.observe(duration)
+    logger.info("Membership sweep deactivated %d customers in %.3fs", deactivated, duration)
+    return deactivated
+
+
+async def run_forever(interval_seconds: float) -> None:
+    """Sweep every ``interval_seconds`` until cancelled; failures are logged and retried next tick."""
+    while True:
+        try:
+            await sweep_once()
+        except Exception:
+            logger.exception("Membership sweep failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deactivate customers with expired memberships.")
+    parser.add_argument("--once", action="store_true", help="Run a single sweep and exit.")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.once:
+        asyncio.run(sweep_once())
+    else:
+        asyncio.run(run_forever(get_settings().membership_sweep_interval_seconds))
+
+
+if __name__ == "__main__":
+    main()
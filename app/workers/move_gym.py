@@ -0,0 +1,41 @@
+﻿"""Offline tool that moves a gym to another shard database.
+
+Run while the gym's traffic is paused::
+
+    python -m app.workers.move_gym 42 east
+
+Running API processes pick up the new placement once their shard map cache
+entry expires (``SHARD_MAP_CACHE_TTL_SECONDS``).
+"""
+
+import argparse
+import asyncio
+
+from app.core.logging import setup_logging
+from app.db.session import shard_router
+from app.services import gym_moves
+
+
+async def move(gym_id: int, target: str, batch_size: int) -> int:
+    try:
+        return await gym_moves.move_gym(shard_router, gym_id, target, batch_size=batch_size)
+    finally:
+        await shard_router.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move a gym and its customers to another shard.")
+    parser.add_argument("gym_id", type=int)
+    parser.add_argument("target", help="Name of the destination shard, as in DATABASE_SHARDS (or 'default').")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Customers copied per INSERT.")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(move(args.gym_id, args.target, args.batch_size))
+    except ValueError as exc:
+        parser.exit(1, f"move_gym: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
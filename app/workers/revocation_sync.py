@@ -0,0 +1,50 @@
+"""Periodic job that refreshes the in-process token denylist from the ``revoked_tokens`` table.
+
+Runs in-process from the application lifespan, or standalone via
+``python -m app.workers.revocation_sync [--once]`` to purge expired rows.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.config import get_settings
+from app.core.logging import setup_logging
+from app.db.session import AsyncSessionLocal
+from app.services import token_revocation
+
+logger = logging.getLogger(__name__)
+
+
+async def sync_once() -> int:
+    """Run a single sync. Returns the number of live revocations loaded."""
+    async with AsyncSessionLocal() as session:
+        loaded = await token_revocation.sync_revocations(session)
+    logger.debug("Loaded %d token revocations", loaded)
+    return loaded
+
+
+async def run_forever(interval_seconds: float) -> None:
+    """Sync every ``interval_seconds`` until cancelled; failures are logged and retried next tick."""
+    while True:
+        try:
+            await sync_once()
+        except Exception:
+            logger.exception("Token revocation sync failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync and purge revoked access and refresh tokens.")
+    parser.add_argument("--once", action="store_true", help="Run a single sync and exit.")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.once:
+        asyncio.run(sync_once())
+    else:
+        asyncio.run(run_forever(get_settings().revocation_sync_interval_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmark: per-request authentication cost with and without the verified-token cache.
+
+Run from the repository root::
+
+    python -m benchmarks.auth_token --iterations 20000
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.api.deps import get_current_gym, get_shard_router, get_token_payload
+from app.core import security
+from app.db.base import Base
+from app.domain import models
+from app.services import gyms as gym_service
+
+
+def measure_decode(verify: Callable[[str], dict], token: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verify(token)
+    return (time.perf_counter() - start) / iterations
+
+
+async def measure_request(
+    session_factory: async_sessionmaker[AsyncSession],
+    token: str,
+    iterations: int,
+) -> float:
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # A fresh session per iteration mirrors one authenticated request.
+        async with session_factory() as session:
+            payload = await get_token_payload(request=request, token=token)
+            await get_current_gym(payload=payload, session=session, router=get_shard_router())
+    return (time.perf_counter() - start) / iterations
+
+
+async def run(iterations: int) -> None:
+    token = security.create_access_token(subject="1")
+
+    baseline = measure_decode(security.decode_access_token, token, iterations)
+    print(f"jwt.decode              {baseline * 1e6:8.2f} us/token")
+    cached = measure_decode(security.verify_access_token, token, iterations)
+    print(f"verified-token cache    {cached * 1e6:8.2f} us/token  ({baseline / cached:.1f}x)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session:
+            session.add(models.Gym(id=1, name="Bench Gym", email="bench@example.com", hashed_password="x"))
+            await session.commit()
+
+        request_iterations = max(iterations // 10, 1)
+        scenarios = (
+            ("no caches", False, False),
+            ("token cache", True, False),
+            ("token + principal cache", True, True),
+        )
+        request_baseline = None
+        for name, token_cache, principal_cache in scenarios:
+            security.settings.token_cache_enabled = token_cache
+            gym_service.settings.principal_cache_enabled = principal_cache
+            security.token_cache.clear()
+            gym_service.principal_cache.clear()
+            elapsed = await measure_request(session_factory, token, request_iterations)
+            request_baseline = request_baseline or elapsed
+            print(f"get_current_gym {name:<24} {elapsed * 1e6:8.2f} us/request  ({request_baseline / elapsed:.1f}x)")
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmark: ORM + ``CustomerOut`` listing path versus the row projection fast path.
+
+Run from the repository root::
+
+    python -m benchmarks.customer_listing --customers 5000 --limit 200 --iterations 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.domain import models, schemas
+from app.services import customers as customer_service
+
+CUSTOMER_LIST_ADAPTER = TypeAdapter(list[schemas.CustomerOut])
+
+
+async def orm_path(session: AsyncSession, gym_id: int, limit: int) -> bytes:
+    # What FastAPI does for response_model=list[CustomerOut] on ORM entities.
+    customers = await customer_service.list_customers(session, gym_id, limit=limit)
+    return CUSTOMER_LIST_ADAPTER.dump_json(CUSTOMER_LIST_ADAPTER.validate_python(customers, from_attributes=True))
+
+
+async def fast_path(session: AsyncSession, gym_id: int, limit: int) -> bytes:
+    rows = await customer_service.list_customer_rows(session, gym_id, limit=limit)
+    return customer_service.rows_to_json(rows)
+
+
+async def sparse_path(session: AsyncSession, gym_id: int, limit: int) -> bytes:
+    fields = customer_service.parse_fields("id,first_name,last_name,email")
+    rows = await customer_service.list_customer_rows(session, gym_id, fields=fields, limit=limit)
+    return customer_service.rows_to_json(rows, fields)
+
+
+async def seed(session_factory: async_sessionmaker[AsyncSession], customers: int) -> int:
+    async with session_factory() as session:
+        gym = models.Gym(name="Bench Gym", email="bench@example.com", hashed_password="x")
+        session.add(gym)
+        await session.commit()
+        await session.execute(
+            insert(models.Customer),
+            [
+                {
+                    "gym_id": gym.id,
+                    "first_name": f"First{index}",
+                    "last_name": f"Last{index}",
+                    "email": f"member{index}@example.com",
+                    "notes": "Prefers morning classes. " * 20,
+                }
+                for index in range(customers)
+            ],
+        )
+        await session.commit()
+        return gym.id
+
+
+async def measure(
+    session_factory: async_sessionmaker[AsyncSession],
+    path: Callable[[AsyncSession, int, int], Awaitable[bytes]],
+    gym_id: int,
+    limit: int,
+    iterations: int,
+) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # A fresh session per iteration mirrors one request per listing.
+        async with session_factory() as session:
+            await path(session, gym_id, limit)
+    return (time.perf_counter() - start) / iterations
+
+
+async def run(customers: int, limit: int, iterations: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        gym_id = await seed(session_factory, customers)
+
+        baseline = await measure(session_factory, orm_path, gym_id, limit, iterations)
+        print(f"orm + CustomerOut      {baseline * 1000:8.2f} ms/request")
+        for name, path in (("row projection", fast_path), ("row projection sparse", sparse_path)):
+            elapsed = await measure(session_factory, path, gym_id, limit, iterations)
+            print(f"{name:<22} {elapsed * 1000:8.2f} ms/request  ({baseline / elapsed:.1f}x)")
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.customers, args.limit, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
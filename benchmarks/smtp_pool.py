@@ -0,0 +1,139 @@
+"""Micro-benchmark: ``SMTPMailer`` throughput with one connection per message vs. pooled connections.
+
+Mail goes to a local ``aiosmtpd`` server with AUTH enabled. ``--latency`` delays
+every server reply, which imitates the round trips to a remote relay. The last
+scenario goes through ``MailProxy`` the way ``get_mailer()`` builds it, so it shows
+the cap that ``MAILER_RATE_LIMIT_SECONDS`` puts on outbox delivery.
+
+Run from the repository root::
+
+    python -m benchmarks.smtp_pool --messages 200 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from app.core.config import get_settings
+from app.core.mailer import MailProxy, Mailer, SMTPMailer
+
+
+class SlowHandler:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses) -> list[str]:
+        await asyncio.sleep(self.latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options) -> str:
+        await asyncio.sleep(self.latency)
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options) -> str:
+        await asyncio.sleep(self.latency)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        await asyncio.sleep(self.latency)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def measure(
+    port: int,
+    messages: int,
+    concurrency: int,
+    rate_limit: float | None = None,
+    **pool_options,
+) -> float:
+    smtp = SMTPMailer(
+        host="127.0.0.1",
+        port=port,
+        username="bench",
+        password="bench",
+        from_email="noreply@example.com",
+        use_tls=False,
+        use_ssl=False,
+        pool_size=concurrency,
+        **pool_options,
+    )
+    mailer: Mailer = smtp
+    if rate_limit is not None:
+        mailer = MailProxy(smtp, min_interval=rate_limit / smtp.max_concurrency, suppress_errors=False)
+    queue = iter(range(messages))
+
+    async def worker() -> None:
+        for index in queue:
+            await mailer.send(f"member{index}@example.com", "Welcome", "Hello from the bench gym.")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await smtp.close()
+    return messages / elapsed
+
+
+async def run(messages: int, latency: float, concurrency: int, rate_limit: float) -> None:
+    # aiosmtpd warns about a deprecated session attribute on every AUTH.
+    logging.getLogger("mail.log").setLevel(logging.ERROR)
+    port = free_port()
+    controller = Controller(
+        SlowHandler(latency),
+        hostname="127.0.0.1",
+        port=port,
+        authenticator=lambda *args: AuthResult(success=True),
+        auth_require_tls=False,
+    )
+    controller.start()
+    try:
+        # One message per connection is what SMTPMailer did before connections were pooled.
+        scenarios = (
+            ("connection per message", 1, 1),
+            ("pooled", 1, 1000),
+            (f"pooled x{concurrency}", concurrency, 1000),
+        )
+        baseline = None
+        for name, workers, max_messages in scenarios:
+            rate = await measure(port, messages, workers, max_messages_per_connection=max_messages)
+            baseline = baseline or rate
+            print(f"{name:<32} {rate:8.1f} msg/s  ({rate / baseline:.1f}x)")
+        if rate_limit > 0:
+            # Throttled sends are slow, so a short run is enough to measure the rate.
+            rate = await measure(port, min(messages, 40), concurrency, rate_limit, max_messages_per_connection=1000)
+            name = f"pooled x{concurrency}, {rate_limit:g}s rate limit"
+            print(f"{name:<32} {rate:8.1f} msg/s  ({rate / baseline:.1f}x)")
+    finally:
+        controller.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds added to every server reply.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent senders in the pooled scenarios.")
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=get_settings().mailer_rate_limit_seconds,
+        help="MAILER_RATE_LIMIT_SECONDS for the MailProxy scenario; 0 skips it.",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.latency, args.concurrency, args.rate_limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Benchmark: concurrent customer listings and writes on SQLite, default journal vs. the production profile.
+
+Run from the repository root::
+
+    python -m benchmarks.sqlite_concurrency --readers 16 --writers 4 --seconds 5
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import Settings
+from app.db.base import Base
+from app.db.session import create_engine
+from app.domain import models
+from app.services import customers as customer_service
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def summary(self, seconds: float) -> str:
+        if not self.latencies:
+            return f"{0:8.1f} ops/s  p50      -     p95      -      errors {self.errors}"
+        p50 = statistics.median(self.latencies) * 1000
+        p95 = statistics.quantiles(self.latencies, n=20)[-1] * 1000 if len(self.latencies) > 1 else p50
+        return (
+            f"{len(self.latencies) / seconds:8.1f} ops/s  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+            f"errors {self.errors}"
+        )
+
+
+async def seed(session_factory: async_sessionmaker[AsyncSession], customers: int) -> int:
+    async with session_factory() as session:
+        gym = models.Gym(name="Bench Gym", email="bench@example.com", hashed_password="x")
+        session.add(gym)
+        await session.commit()
+        await session.execute(
+            insert(models.Customer),
+            [
+                {
+                    "gym_id": gym.id,
+                    "first_name": f"First{index}",
+                    "last_name": f"Last{index}",
+                    "email": f"member{index}@example.com",
+                }
+                for index in range(customers)
+            ],
+        )
+        await session.commit()
+        return gym.id
+
+
+async def reader(session_factory: async_sessionmaker[AsyncSession], gym_id: int, deadline: float, stats: Stats) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session_factory() as session:
+                await customer_service.list_customer_rows(session, gym_id, limit=50)
+        except sa_exc.OperationalError:
+            stats.errors += 1
+            continue
+        stats.latencies.append(time.perf_counter() - start)
+
+
+async def writer(
+    session_factory: async_sessionmaker[AsyncSession],
+    gym_id: int,
+    worker: int,
+    deadline: float,
+    stats: Stats,
+) -> None:
+    sequence = 0
+    while time.perf_counter() < deadline:
+        sequence += 1
+        start = time.perf_counter()
+        try:
+            async with session_factory() as session:
+                await session.execute(
+                    insert(models.Customer).values(
+                        gym_id=gym_id,
+                        first_name="Writer",
+                        last_name=str(worker),
+                        email=f"writer{worker}-{sequence}@example.com",
+                    )
+                )
+                await session.execute(
+                    update(models.Customer)
+                    .where(models.Customer.id == sequence)
+                    .values(notes=f"touched by {worker}")
+                )
+                await session.commit()
+        except sa_exc.OperationalError:
+            stats.errors += 1
+            continue
+        stats.latencies.append(time.perf_counter() - start)
+
+
+async def run_profile(
+    name: str,
+    settings: Settings,
+    directory: Path,
+    customers: int,
+    readers: int,
+    writers: int,
+    seconds: float,
+) -> None:
+    engine: AsyncEngine = create_engine(f"sqlite+aiosqlite:///{directory / f'{name}.db'}", settings, name=name)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    gym_id = await seed(session_factory, customers)
+
+    read_stats, write_stats = Stats(), Stats()
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(
+        *(reader(session_factory, gym_id, deadline, read_stats) for _ in range(readers)),
+        *(writer(session_factory, gym_id, worker, deadline, write_stats) for worker in range(writers)),
+    )
+    await engine.dispose()
+
+    print(f"{name:<10} reads  {read_stats.summary(seconds)}")
+    print(f"{'':<10} writes {write_stats.summary(seconds)}")
+
+
+async def run(customers: int, readers: int, writers: int, seconds: float, directory: str | None) -> None:
+    pool = {"DB_POOL_SIZE": readers + writers, "DB_MAX_OVERFLOW": 0}
+    profiles = (
+        ("default", Settings(SQLITE_PROFILE_ENABLED=False, **pool)),
+        ("profile", Settings(**pool)),
+    )
+    with tempfile.TemporaryDirectory(dir=directory) as temp_directory:
+        for name, settings in profiles:
+            await run_profile(name, settings, Path(temp_directory), customers, readers, writers, seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument(
+        "--directory",
+        default=".",
+        help="Where to create the databases; use a real disk, since fsync cost is part of the comparison.",
+    )
+    args = parser.parse_args()
+    # Contended writes are slow by design here; keep the slow-query log out of the results.
+    logging.getLogger("app.db.slow_query").setLevel(logging.ERROR)
+    asyncio.run(run(args.customers, args.readers, args.writers, args.seconds, args.directory))
+
+
+if __name__ == "__main__":
+    main()
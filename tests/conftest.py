@@ -1,10 +1,9 @@
 ﻿from __future__ import annotations
 
-import asyncio
 import os
 import sys
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Awaitable, Callable
 
 import pytest
 import pytest_asyncio
@@ -15,16 +14,27 @@ ROOT_PATH = Path(__file__).resolve().parents[1]
 if str(ROOT_PATH) not in sys.path:
     sys.path.append(str(ROOT_PATH))
 
-from app.api.deps import get_db
+from app.api import deps
+from app.api.deps import get_db, get_replica_db, get_shard_router
 from app.core import mailer as mailer_module
+from app.core import security
 from app.core.security import get_password_hash
 from app.db.base import Base
+from app.db.instrumentation import instrument_engine
+from app.db.sharding import DEFAULT_SHARD, ShardRouter
 from app.domain import models
 from app.main import app
+from app.services import auth as auth_service
+from app.services import email_outbox
+from app.services import gyms as gym_service
+from app.services.token_revocation import revoked_tokens
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 engine = create_async_engine(TEST_DATABASE_URL, future=True)
+instrument_engine(engine)
 TestingSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# Work that opens its own sessions (background gym deletion) goes through the router.
+test_shard_router = ShardRouter({DEFAULT_SHARD: engine})
 transport = ASGITransport(app=app)
 
 
@@ -35,10 +45,6 @@ class _StubMailer(mailer_module.Mailer):
     async def send(self, to: str, subject: str, body: str) -> None:
         self.sent.append((to, subject, body))
 
-    def add_task(self, func, *args, **kwargs):
-        # Simulate BackgroundTasks.add_task by running immediately.
-        return asyncio.get_event_loop().create_task(func(*args, **kwargs))
-
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def setup_database() -> AsyncGenerator[None, None]:
@@ -60,8 +66,13 @@ async def override_dependencies() -> AsyncGenerator[None, None]:
             yield session
 
     app.dependency_overrides[get_db] = _get_test_session
+    # Reads share the primary test database unless a test wires up a replica.
+    app.dependency_overrides[get_replica_db] = _get_test_session
+    app.dependency_overrides[get_shard_router] = lambda: test_shard_router
     yield
     app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_replica_db, None)
+    app.dependency_overrides.pop(get_shard_router, None)
 
 
 @pytest_asyncio.fixture(autouse=True)
@@ -72,6 +83,17 @@ async def reset_tables() -> AsyncGenerator[None, None]:
             await conn.execute(table.delete())
 
 
+@pytest.fixture(autouse=True)
+def clear_auth_caches() -> None:
+    # SQLite reuses ids once tables are emptied, so cached principals must not leak between tests.
+    gym_service.principal_cache.clear()
+    security.token_cache.clear()
+    revoked_tokens.clear()
+    auth_service.login_email_limiter.clear()
+    auth_service.login_ip_limiter.clear()
+    deps.recent_writers.clear()
+
+
 @pytest.fixture(autouse=True)
 def stub_mailer(monkeypatch: pytest.MonkeyPatch) -> _StubMailer:
     original_get_mailer = mailer_module.get_mailer
@@ -92,6 +114,17 @@ def mailer_stub(stub_mailer: _StubMailer) -> _StubMailer:
     return stub_mailer
 
 
+@pytest.fixture()
+def drain_outbox(stub_mailer: _StubMailer) -> Callable[[], Awaitable[email_outbox.DrainResult]]:
+    """Deliver queued outbox mail to the stub mailer, as the outbox worker would."""
+
+    async def _drain() -> email_outbox.DrainResult:
+        async with TestingSessionLocal() as session:
+            return await email_outbox.drain_batch(session, stub_mailer)
+
+    return _drain
+
+
 @pytest_asyncio.fixture()
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     async with TestingSessionLocal() as session:
@@ -113,6 +146,8 @@ async def create_gym(db_session: AsyncSession) -> AsyncGenerator[models.Gym, Non
         monthly_fee_cents=5000,
         currency="USD",
     )
+    # Register the gym in the shard directory like a signup would, so ids stay unique.
+    gym.id, _ = await test_shard_router.register_gym(db_session, gym.email)
     db_session.add(gym)
     await db_session.commit()
     await db_session.refresh(gym)
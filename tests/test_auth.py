@@ -1,17 +1,25 @@
-﻿import pytest
+﻿import asyncio
+
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_api_prefix
 from app.domain import models
 from app.core import security
+from app.core.rate_limit import TokenBucketLimiter, TrustedProxies
+from app.services import auth as auth_service
+from app.services.token_revocation import revoked_tokens
 
 pytestmark = pytest.mark.asyncio
 
 API_PREFIX = get_api_prefix()
 
 
-async def test_signup_creates_gym(client: AsyncClient, db_session: AsyncSession, mailer_stub) -> None:
+async def test_signup_creates_gym(
+    client: AsyncClient, db_session: AsyncSession, mailer_stub, drain_outbox
+) -> None:
     payload = {
         "name": "Downtown Gym",
         "email": "owner@example.com",
@@ -28,7 +36,9 @@ async def test_signup_creates_gym(client: AsyncClient, db_session: AsyncSession,
     gym = await db_session.get(models.Gym, data["id"])
     assert gym is not None
     assert gym.hashed_password != payload["password"]
-    # BackgroundTasks is not used in the test client, so mailer_stub should still capture sends if scheduled.
+    # The welcome mail is queued with the gym and sent by the outbox worker, not by the request.
+    assert mailer_stub.sent == []
+    await drain_outbox()
     assert len(mailer_stub.sent) == 1
     sent_to, subject, body = mailer_stub.sent[0]
     assert sent_to == payload["email"]
@@ -61,6 +71,7 @@ async def test_login_returns_token(client: AsyncClient, create_gym: models.Gym)
     assert response.status_code == 200
     data = response.json()
     assert "access_token" in data
+    assert "refresh_token" in data
     assert data["token_type"] == "bearer"
 
 
@@ -83,6 +94,144 @@ async def test_login_unknown_email(client: AsyncClient) -> None:
     assert response.json()["detail"] == "Incorrect email or password"
 
 
+async def test_login_returns_503_when_hashing_pool_saturated(
+    client: AsyncClient, create_gym: models.Gym, monkeypatch
+) -> None:
+    async def saturated(*args, **kwargs):
+        raise security.PasswordHashingUnavailable("Password hashing capacity exceeded")
+
+    monkeypatch.setattr(security.password_hasher, "verify", saturated)
+
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": create_gym.email, "password": "password123"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+async def test_login_throttles_repeated_attempts_per_email(
+    client: AsyncClient, create_gym: models.Gym, monkeypatch
+) -> None:
+    monkeypatch.setattr(
+        auth_service,
+        "login_email_limiter",
+        TokenBucketLimiter("login_email", capacity=2, refill_per_second=0.1, max_keys=10),
+    )
+    verify_calls = []
+    original_verify = security.password_hasher.verify
+
+    async def counting_verify(*args):
+        verify_calls.append(args)
+        return await original_verify(*args)
+
+    monkeypatch.setattr(security.password_hasher, "verify", counting_verify)
+
+    statuses = []
+    # The throttle key is case-insensitive, so changing case does not buy extra attempts.
+    for username in (create_gym.email, create_gym.email, create_gym.email.upper()):
+        response = await client.post(
+            f"{API_PREFIX}/auth/login",
+            data={"username": username, "password": "wrong"},
+        )
+        statuses.append(response.status_code)
+
+    assert statuses == [400, 400, 429]
+    assert response.headers["retry-after"] == "10"
+    assert len(verify_calls) == 2
+
+
+async def test_login_ip_throttle_keys_forwarded_clients_separately(
+    client: AsyncClient, create_gym: models.Gym, monkeypatch
+) -> None:
+    monkeypatch.setattr(
+        auth_service,
+        "login_ip_limiter",
+        TokenBucketLimiter("login_ip", capacity=1, refill_per_second=0.1, max_keys=10),
+    )
+    # The test client connects from 127.0.0.1, standing in for the front-end proxy.
+    monkeypatch.setattr(auth_service, "trusted_proxies", TrustedProxies("127.0.0.1"))
+
+    statuses = []
+    for forwarded_for in ("203.0.113.5", "203.0.113.5", "198.51.100.7, 127.0.0.1"):
+        response = await client.post(
+            f"{API_PREFIX}/auth/login",
+            data={"username": create_gym.email, "password": "wrong"},
+            headers={"X-Forwarded-For": forwarded_for},
+        )
+        statuses.append(response.status_code)
+
+    assert statuses == [400, 429, 400]
+
+
+async def _login(client: AsyncClient, gym: models.Gym) -> dict:
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": gym.email, "password": "password123"},
+    )
+    return response.json()
+
+
+async def test_refresh_rotates_token_pair(client: AsyncClient, create_gym: models.Gym) -> None:
+    tokens = await _login(client, create_gym)
+
+    response = await client.post(f"{API_PREFIX}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    rotated = response.json()
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert me.status_code == 200
+
+    # Refresh tokens are single use.
+    replay = await client.post(f"{API_PREFIX}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    assert replay.json()["detail"] == "Invalid refresh token"
+
+
+async def test_concurrent_refreshes_with_one_token_issue_one_pair(
+    client: AsyncClient, create_gym: models.Gym
+) -> None:
+    tokens = await _login(client, create_gym)
+    body = {"refresh_token": tokens["refresh_token"]}
+
+    responses = await asyncio.gather(*(client.post(f"{API_PREFIX}/auth/refresh", json=body) for _ in range(2)))
+
+    assert sorted(response.status_code for response in responses) == [200, 401]
+    # Another worker whose denylist has not synced yet is still refused by the database.
+    revoked_tokens.clear()
+    replay = await client.post(f"{API_PREFIX}/auth/refresh", json=body)
+    assert replay.status_code == 401
+
+
+async def test_token_types_are_not_interchangeable(client: AsyncClient, create_gym: models.Gym) -> None:
+    tokens = await _login(client, create_gym)
+
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert me.status_code == 401
+
+    response = await client.post(f"{API_PREFIX}/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == 401
+
+
+async def test_logout_revokes_access_and_refresh_tokens(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession
+) -> None:
+    tokens = await _login(client, create_gym)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await client.post(
+        f"{API_PREFIX}/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers
+    )
+    assert response.status_code == 204
+
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+    assert me.status_code == 401
+    assert me.json()["detail"] == "Token has been revoked"
+    refreshed = await client.post(f"{API_PREFIX}/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 401
+    assert await db_session.scalar(select(func.count()).select_from(models.RevokedToken)) == 2
+
+
 async def test_oauth_token_url_matches_prefix() -> None:
     prefix = get_api_prefix()
     assert security.settings.api_prefix == prefix or security.settings.api_prefix.rstrip("/") == prefix.rstrip("/")
@@ -0,0 +1,43 @@
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries() -> None:
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache("test", max_entries=10, ttl_seconds=5, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=1)
+    clock.now = 2
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now = 6
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache("test", max_entries=2, ttl_seconds=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_disabled_when_empty_capacity() -> None:
+    cache: TTLCache[str, int] = TTLCache("test", max_entries=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
@@ -1,4 +1,7 @@
-﻿import pytest
+﻿import json
+from datetime import date, timedelta
+
+import pytest
 from httpx import AsyncClient
 
 from app.core.config import get_api_prefix
@@ -137,6 +140,232 @@ async def test_list_customers_limit_bounds(client: AsyncClient, create_gym: mode
     assert resp_offset.status_code == 422
 
 
+async def test_list_customers_cursor_pagination(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    for index in range(3):
+        await create_customer(client, headers, f"page{index}@example.com")
+
+    first_page = await client.get(f"{API_PREFIX}/customers", params={"limit": 2}, headers=headers)
+    assert first_page.status_code == 200
+    assert [c["email"] for c in first_page.json()] == ["page2@example.com", "page1@example.com"]
+    next_cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = await client.get(
+        f"{API_PREFIX}/customers",
+        params={"limit": 2, "cursor": next_cursor},
+        headers=headers,
+    )
+    assert second_page.status_code == 200
+    assert [c["email"] for c in second_page.json()] == ["page0@example.com"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+    invalid = await client.get(f"{API_PREFIX}/customers", params={"cursor": "garbage"}, headers=headers)
+    assert invalid.status_code == 400
+
+
+async def test_import_customers_from_csv_reports_row_errors(
+    client: AsyncClient, create_gym: models.Gym, mailer_stub, drain_outbox
+) -> None:
+    headers = await auth_header(client, create_gym)
+    body = (
+        "first_name,last_name,email,membership_end,notes\r\n"
+        "Ana,Lopez,ana@example.com,,\"Prefers mornings,\nno weekends\"\r\n"
+        "Bad,Row,not-an-email,,\r\n"
+        "Old,Member,old@example.com,2000-01-01,\r\n"
+    )
+
+    response = await client.post(
+        f"{API_PREFIX}/customers/import",
+        content=body,
+        headers={**headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert "email" in result["errors"][0]["errors"][0]
+    assert (await drain_outbox()).claimed == 0
+    assert mailer_stub.sent == []
+
+    listed = {c["email"]: c for c in (await client.get(f"{API_PREFIX}/customers", headers=headers)).json()}
+    assert listed["ana@example.com"]["notes"] == "Prefers mornings,\nno weekends"
+    assert listed["old@example.com"]["active"] is False
+
+
+async def test_import_customers_from_ndjson_with_welcome_mail(
+    client: AsyncClient, create_gym: models.Gym, mailer_stub, drain_outbox
+) -> None:
+    headers = await auth_header(client, create_gym)
+    body = '{"first_name": "Lee", "last_name": "Park", "email": "lee@example.com"}\n{oops\n'
+
+    response = await client.post(
+        f"{API_PREFIX}/customers/import",
+        params={"format": "ndjson", "send_welcome": True},
+        content=body,
+        headers=headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 1
+    assert result["errors"][0]["row"] == 2
+    await drain_outbox()
+    assert [sent[0] for sent in mailer_stub.sent] == ["lee@example.com"]
+
+
+async def test_import_customers_rejects_unknown_format(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    response = await client.post(
+        f"{API_PREFIX}/customers/import",
+        content="<customers/>",
+        headers={**headers, "Content-Type": "application/xml"},
+    )
+    assert response.status_code == 415
+
+
+async def test_list_customers_sparse_fieldset(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    await create_customer(client, headers, "sparse@example.com")
+
+    response = await client.get(
+        f"{API_PREFIX}/customers",
+        params={"fields": "id,email,active", "limit": 1},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    [customer] = response.json()
+    assert set(customer) == {"id", "email", "active"}
+    assert "X-Next-Cursor" in response.headers
+
+    invalid = await client.get(f"{API_PREFIX}/customers", params={"fields": "password"}, headers=headers)
+    assert invalid.status_code == 400
+
+
+async def test_export_customers_streams_csv_and_ndjson(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    await create_customer(client, headers, "keep@example.com", first_name="Keep")
+    await create_customer(client, headers, "other@example.com", first_name="Other", active=False)
+
+    csv_response = await client.get(
+        f"{API_PREFIX}/customers/export",
+        params={"active": True},
+        headers=headers,
+    )
+    assert csv_response.status_code == 200
+    assert csv_response.headers["content-type"].startswith("text/csv")
+    lines = csv_response.text.splitlines()
+    assert lines[0].startswith("id,gym_id,first_name")
+    assert len(lines) == 2
+    assert "keep@example.com" in lines[1]
+
+    ndjson_response = await client.get(
+        f"{API_PREFIX}/customers/export",
+        params={"format": "ndjson"},
+        headers=headers,
+    )
+    assert ndjson_response.status_code == 200
+    rows = [json.loads(line) for line in ndjson_response.text.splitlines()]
+    assert [(row["email"], row["active"]) for row in rows] == [
+        ("other@example.com", False),
+        ("keep@example.com", True),
+    ]
+    assert rows[0]["date_of_birth"] == "1990-01-01"
+
+    invalid = await client.get(
+        f"{API_PREFIX}/customers/export",
+        params={"min_age": 50, "max_age": 10},
+        headers=headers,
+    )
+    assert invalid.status_code == 400
+
+
+async def test_customer_stats_aggregates_in_sql(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    soon = (date.today() + timedelta(days=5)).isoformat()
+    later = (date.today() + timedelta(days=20)).isoformat()
+    await create_customer(client, headers, "soon@example.com", membership_end=soon, date_of_birth="1990-01-01")
+    await create_customer(client, headers, "later@example.com", membership_end=later, date_of_birth=None)
+    await create_customer(client, headers, "lapsed@example.com", membership_end="2000-01-01")
+    await create_customer(
+        client,
+        headers,
+        "teen@example.com",
+        active=False,
+        date_of_birth=(date.today() - timedelta(days=15 * 365)).isoformat(),
+    )
+
+    response = await client.get(f"{API_PREFIX}/customers/stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["total"] == 4
+    assert stats["active"] == 2
+    assert stats["inactive"] == 2
+    assert stats["expiring_within_7_days"] == 1
+    assert stats["expiring_within_30_days"] == 2
+    assert stats["age_bands"]["under_18"] == 1
+    assert stats["age_bands"]["age_30_44"] == 2
+    assert stats["age_bands"]["unknown"] == 1
+
+    filtered = await client.get(f"{API_PREFIX}/customers/stats", params={"active": False}, headers=headers)
+    assert filtered.json()["total"] == 2
+
+
+async def test_bulk_update_customers_by_filter(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    await create_customer(client, headers, "one@example.com", first_name="Robin")
+    await create_customer(client, headers, "two@example.com", first_name="Robin")
+    untouched = await create_customer(client, headers, "three@example.com", first_name="Casey")
+
+    response = await client.post(
+        f"{API_PREFIX}/customers/bulk-update",
+        params={"first_name": "Robin"},
+        json={"patch": {"membership_end": "2099-12-31", "notes": "Closure extension"}},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": 2}
+
+    listed = {c["email"]: c for c in (await client.get(f"{API_PREFIX}/customers", headers=headers)).json()}
+    assert listed["one@example.com"]["membership_end"] == "2099-12-31"
+    assert listed["two@example.com"]["notes"] == "Closure extension"
+    assert listed[untouched["email"]]["notes"] is None
+
+
+async def test_bulk_update_customers_validation(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+
+    no_selector = await client.post(
+        f"{API_PREFIX}/customers/bulk-update",
+        json={"patch": {"active": False}},
+        headers=headers,
+    )
+    assert no_selector.status_code == 400
+
+    empty_patch = await client.post(
+        f"{API_PREFIX}/customers/bulk-update",
+        json={"ids": [1], "patch": {}},
+        headers=headers,
+    )
+    assert empty_patch.status_code == 400
+
+
+async def test_bulk_delete_customers_by_ids_is_scoped_to_gym(client: AsyncClient, create_gym: models.Gym) -> None:
+    headers = await auth_header(client, create_gym)
+    first = await create_customer(client, headers, "gone@example.com")
+    second = await create_customer(client, headers, "stays@example.com")
+
+    response = await client.post(
+        f"{API_PREFIX}/customers/bulk-delete",
+        json={"ids": [first["id"], 999999]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": 1}
+
+    remaining = (await client.get(f"{API_PREFIX}/customers", headers=headers)).json()
+    assert [c["id"] for c in remaining] == [second["id"]]
+
+
 async def test_auto_deactivation_on_expiry(client: AsyncClient, create_gym: models.Gym) -> None:
     headers = await auth_header(client, create_gym)
     created = await create_customer(
@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+from app.core.config import get_api_prefix
+from app.db import instrumentation
+from app.db.instrumentation import redact_parameters, statement_labels
+from app.domain import models
+
+pytestmark = pytest.mark.asyncio
+
+API_PREFIX = get_api_prefix()
+
+
+async def test_statement_labels_name_operation_and_table() -> None:
+    assert statement_labels('SELECT customers.id FROM "customers" WHERE customers.gym_id = ?') == (
+        "SELECT",
+        "customers",
+    )
+    assert statement_labels("UPDATE gyms SET name=? WHERE gyms.id = ? RETURNING gyms.id") == ("UPDATE", "gyms")
+    assert statement_labels("insert into customers (first_name) values (?)") == ("INSERT", "customers")
+    assert statement_labels("SELECT count(*) FROM (SELECT id FROM customers) AS anon_1") == ("SELECT", "customers")
+    assert statement_labels("PRAGMA main.table_info(gyms)") == ("PRAGMA", "-")
+
+
+async def test_request_statement_count_is_recorded(client: AsyncClient, create_gym: models.Gym) -> None:
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": create_gym.email, "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    labels = {"method": "GET", "path": f"{API_PREFIX}/gyms/me"}
+    before_count = REGISTRY.get_sample_value("http_request_db_statements_count", labels) or 0
+    before_sum = REGISTRY.get_sample_value("http_request_db_statements_sum", labels) or 0
+
+    # The first request loads the gym principal; the second is served from the caches.
+    await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+    await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert REGISTRY.get_sample_value("http_request_db_statements_count", labels) == before_count + 2
+    assert REGISTRY.get_sample_value("http_request_db_statements_sum", labels) == before_sum + 1
+    assert REGISTRY.get_sample_value(
+        "db_statement_duration_seconds_count", {"operation": "SELECT", "table": "gyms"}
+    )
+
+
+async def test_redact_parameters_hides_sensitive_columns() -> None:
+    assert redact_parameters(("Ana", "a@example.com", 3), ["first_name", "email", "gym_id"]) == (
+        "Ana",
+        "<redacted>",
+        3,
+    )
+    assert redact_parameters({"email_1": "a@example.com", "id_1": 7}, None) == {"email_1": "<redacted>", "id_1": 7}
+    assert redact_parameters([("x", "secret")], ["name", "hashed_password"]) == [("x", "<redacted>")]
+    assert redact_parameters(("a@example.com",), None) == "<redacted>"
+
+
+async def test_slow_query_log_includes_route_and_redacted_parameters(
+    client: AsyncClient, create_gym: models.Gym, monkeypatch, caplog
+) -> None:
+    monkeypatch.setattr(instrumentation.settings, "slow_query_threshold_ms", 0.000001)
+    monkeypatch.setattr(instrumentation.settings, "slow_query_log_parameters", True)
+
+    with caplog.at_level(logging.WARNING, logger="app.db.slow_query"):
+        await client.post(
+            f"{API_PREFIX}/auth/login",
+            data={"username": create_gym.email, "password": "password123"},
+        )
+
+    messages = [record.getMessage() for record in caplog.records if record.name == "app.db.slow_query"]
+    login_messages = [message for message in messages if f"POST {API_PREFIX}/auth/login" in message]
+    assert any("FROM gyms" in message and "<redacted>" in message for message in login_messages)
+    assert not any(create_gym.email in message for message in login_messages)
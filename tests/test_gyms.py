@@ -1,8 +1,13 @@
-﻿import pytest
+﻿from datetime import timedelta
+
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_api_prefix
-from app.domain import models
+from app.domain import models, schemas
+from app.services import gyms as gym_service
 
 pytestmark = pytest.mark.asyncio
 
@@ -72,3 +77,132 @@ async def test_delete_current_gym(client: AsyncClient, create_gym: models.Gym) -
         headers={"Authorization": f"Bearer {token}"},
     )
     assert follow_up.status_code == 401
+
+
+async def test_get_gym_principal_served_from_cache(db_session: AsyncSession, create_gym: models.Gym) -> None:
+    first = await gym_service.get_gym_principal(db_session, create_gym.id)
+    assert first is not None
+
+    # Remove the row behind the cache's back: a cache hit must not query the database.
+    await db_session.execute(delete(models.Customer))
+    await db_session.execute(delete(models.Gym).where(models.Gym.id == create_gym.id))
+    await db_session.commit()
+    db_session.expunge_all()
+
+    cached = await gym_service.get_gym_principal(db_session, create_gym.id)
+    assert cached is not None
+    assert cached.email == create_gym.email
+
+
+async def test_update_gym_invalidates_principal_cache(db_session: AsyncSession, create_gym: models.Gym) -> None:
+    gym = await gym_service.get_gym_principal(db_session, create_gym.id)
+    await gym_service.update_gym(db_session, gym, schemas.GymUpdate(name="Renamed Gym"))
+    db_session.expunge_all()
+
+    assert gym_service.principal_cache.get(create_gym.id) is None
+    reloaded = await gym_service.get_gym_principal(db_session, create_gym.id)
+    assert reloaded.name == "Renamed Gym"
+
+
+async def test_cached_principal_can_be_updated_through_api(client: AsyncClient, create_gym: models.Gym) -> None:
+    token = await login_and_get_token(client, create_gym)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert (await client.get(f"{API_PREFIX}/gyms/me", headers=headers)).status_code == 200
+    updated = await client.patch(f"{API_PREFIX}/gyms/me", json={"name": "Cached Gym"}, headers=headers)
+    assert updated.status_code == 200
+
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+    assert me.json()["name"] == "Cached Gym"
+
+
+async def test_delete_large_gym_runs_in_background(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession, monkeypatch
+) -> None:
+    monkeypatch.setattr(gym_service.settings, "gym_delete_sync_max_customers", 2)
+    monkeypatch.setattr(gym_service.settings, "gym_delete_chunk_size", 2)
+    db_session.add_all(
+        models.Customer(gym_id=create_gym.id, first_name="Member", last_name=str(index), email=f"m{index}@example.com")
+        for index in range(5)
+    )
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {await login_and_get_token(client, create_gym)}"}
+
+    response = await client.delete(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+    # The test client runs background tasks before returning, so the deletion has finished.
+    status_response = await client.get(response.headers["location"], headers=headers)
+    assert status_response.status_code == 200
+    assert status_response.json()["status"] == "completed"
+    assert status_response.json()["deleted_customers"] == 5
+    assert status_response.json()["finished_at"] is not None
+
+    db_session.expunge_all()
+    assert await db_session.get(models.Gym, create_gym.id) is None
+    assert (await db_session.scalars(select(models.Customer))).all() == []
+    assert (await client.get(f"{API_PREFIX}/gyms/me", headers=headers)).status_code == 401
+
+
+async def test_repeated_delete_returns_the_unfinished_deletion(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession, monkeypatch
+) -> None:
+    monkeypatch.setattr(gym_service.settings, "gym_delete_sync_max_customers", 0)
+    db_session.add(models.Customer(gym_id=create_gym.id, first_name="Member", last_name="One", email="m@example.com"))
+    db_session.add(models.GymDeletion(id="inflight", gym_id=create_gym.id, status="running", deleted_customers=0))
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {await login_and_get_token(client, create_gym)}"}
+
+    response = await client.delete(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert response.status_code == 202
+    assert response.json()["id"] == "inflight"
+    assert response.headers["location"].endswith("/gyms/deletions/inflight")
+    assert await db_session.scalar(select(func.count()).select_from(models.GymDeletion)) == 1
+    # No second run was started, so the gym is still there.
+    assert (await client.get(f"{API_PREFIX}/gyms/me", headers=headers)).status_code == 200
+
+
+async def test_delete_restarts_a_deletion_abandoned_by_its_worker(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession, monkeypatch
+) -> None:
+    monkeypatch.setattr(gym_service.settings, "gym_delete_sync_max_customers", 0)
+    db_session.add(models.Customer(gym_id=create_gym.id, first_name="Member", last_name="One", email="m@example.com"))
+    # A run whose worker restarted mid-deletion: still "running", but silent for longer than the lease.
+    stale = models.utcnow() - timedelta(seconds=gym_service.settings.gym_delete_lease_seconds + 60)
+    db_session.add(
+        models.GymDeletion(
+            id="abandoned",
+            gym_id=create_gym.id,
+            status="running",
+            deleted_customers=0,
+            created_at=stale,
+            heartbeat_at=stale,
+        )
+    )
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {await login_and_get_token(client, create_gym)}"}
+
+    response = await client.delete(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert response.status_code == 202
+    assert response.json()["id"] != "abandoned"
+    status_response = await client.get(response.headers["location"], headers=headers)
+    assert status_response.json()["status"] == "completed"
+    abandoned = await client.get(f"{API_PREFIX}/gyms/deletions/abandoned", headers=headers)
+    assert abandoned.json()["status"] == "failed"
+    db_session.expunge_all()
+    assert await db_session.get(models.Gym, create_gym.id) is None
+
+
+async def test_gym_deletion_status_is_private(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession
+) -> None:
+    db_session.add(models.GymDeletion(id="other", gym_id=create_gym.id + 1, status="completed", deleted_customers=0))
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {await login_and_get_token(client, create_gym)}"}
+
+    response = await client.get(f"{API_PREFIX}/gyms/deletions/other", headers=headers)
+
+    assert response.status_code == 404
@@ -1,8 +1,12 @@
 ﻿import asyncio
+import socket
+from collections.abc import Iterator
 
 import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
 
-from app.core.mailer import ConsoleMailer, MailProxy, Mailer
+from app.core.mailer import ConsoleMailer, MailProxy, Mailer, SMTPMailer
 
 pytestmark = pytest.mark.asyncio
 
@@ -26,6 +30,17 @@ async def test_mail_proxy_retries_and_succeeds(capsys: pytest.CaptureFixture[str
     assert flaky.calls == 2
 
 
+async def test_mail_proxy_raises_after_retries_when_not_suppressing() -> None:
+    class BrokenMailer(Mailer):
+        async def send(self, to: str, subject: str, body: str) -> None:
+            raise RuntimeError("smtp down")
+
+    proxy = MailProxy(BrokenMailer(), max_retries=1, retry_delay=0, min_interval=0, suppress_errors=False)
+
+    with pytest.raises(RuntimeError):
+        await proxy.send("user@example.com", "Subject", "Body")
+
+
 async def test_console_mailer_outputs_to_stdout(capsys: pytest.CaptureFixture[str]) -> None:
     mailer = ConsoleMailer()
     await mailer.send("dest@example.com", "Hello", "Message body")
@@ -42,3 +57,115 @@ async def test_mail_proxy_rate_limiting() -> None:
     await proxy.send("user@example.com", "Subject", "One")
     await proxy.send("user@example.com", "Subject", "Two")
     # No assertion besides ensuring it does not raise; awaits cover both branches.
+
+
+class RecordingHandler:
+    """``aiosmtpd`` handler that records each delivered message with the connection it arrived on."""
+
+    def __init__(self) -> None:
+        self.deliveries: list[tuple[tuple, list[str]]] = []
+        self.logins = 0
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.deliveries.append((session.peer, envelope.rcpt_tos))
+        return "250 OK"
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data) -> AuthResult:
+        self.logins += 1
+        return AuthResult(success=True)
+
+    @property
+    def connections(self) -> int:
+        return len({peer for peer, _ in self.deliveries})
+
+
+class SMTPServer:
+    def __init__(self) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.handler = RecordingHandler()
+        self.controller: Controller | None = None
+
+    def start(self) -> None:
+        self.controller = Controller(
+            self.handler,
+            hostname="127.0.0.1",
+            port=self.port,
+            authenticator=self.handler.authenticate,
+            auth_require_tls=False,
+        )
+        self.controller.start()
+
+    def restart(self) -> None:
+        # Stopping the server drops every open client connection.
+        self.controller.stop()
+        self.start()
+
+
+@pytest.fixture()
+def smtp_server() -> Iterator[SMTPServer]:
+    server = SMTPServer()
+    server.start()
+    yield server
+    server.controller.stop()
+
+
+def smtp_mailer(server: SMTPServer, **pool_options) -> SMTPMailer:
+    return SMTPMailer(
+        host="127.0.0.1",
+        port=server.port,
+        username="gym",
+        password="secret",
+        from_email="noreply@example.com",
+        use_tls=False,
+        use_ssl=False,
+        **pool_options,
+    )
+
+
+async def test_smtp_mailer_reuses_one_logged_in_connection(smtp_server: SMTPServer) -> None:
+    mailer = smtp_mailer(smtp_server)
+
+    for index in range(3):
+        await mailer.send(f"user{index}@example.com", "Subject", "Body")
+    await mailer.close()
+
+    assert [rcpt for _, rcpt in smtp_server.handler.deliveries] == [
+        ["user0@example.com"],
+        ["user1@example.com"],
+        ["user2@example.com"],
+    ]
+    assert smtp_server.handler.connections == 1
+    assert smtp_server.handler.logins == 1
+
+
+async def test_smtp_mailer_retires_connections(smtp_server: SMTPServer) -> None:
+    capped = smtp_mailer(smtp_server, max_messages_per_connection=2)
+    for _ in range(5):
+        await capped.send("user@example.com", "Subject", "Body")
+    await capped.close()
+    assert smtp_server.handler.connections == 3
+
+    smtp_server.handler.deliveries.clear()
+    expiring = smtp_mailer(smtp_server, idle_timeout=0)
+    for _ in range(2):
+        await expiring.send("user@example.com", "Subject", "Body")
+    await expiring.close()
+    assert smtp_server.handler.connections == 2
+
+
+@pytest.mark.parametrize("noop_after", [0, 60], ids=["noop-check", "retry-on-send"])
+async def test_smtp_mailer_reconnects_after_server_drops_connection(
+    smtp_server: SMTPServer, noop_after: float
+) -> None:
+    mailer = smtp_mailer(smtp_server, noop_after=noop_after)
+    await mailer.send("first@example.com", "Subject", "Body")
+
+    smtp_server.restart()
+    await mailer.send("second@example.com", "Subject", "Body")
+    await mailer.close()
+
+    assert [rcpt for _, rcpt in smtp_server.handler.deliveries] == [["first@example.com"], ["second@example.com"]]
+    assert smtp_server.handler.connections == 2
+    assert smtp_server.handler.logins == 2
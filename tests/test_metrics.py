@@ -1,5 +1,10 @@
 import pytest
 from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import exc as sa_exc
+
+from app.core.config import Settings
+from app.db.session import create_engine, engine_options
 
 pytestmark = pytest.mark.asyncio
 
@@ -20,3 +25,29 @@ async def test_metrics_records_error_path(client: AsyncClient) -> None:
     assert response.status_code == 200
     body = response.text
     assert 'status_code="404"' in body
+
+
+async def test_pool_metrics_track_checkouts_and_timeouts(tmp_path) -> None:
+    settings = Settings(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.05)
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", settings, name="test_pool")
+    labels = {"pool": "test_pool"}
+    try:
+        async with engine.connect():
+            assert REGISTRY.get_sample_value("db_pool_checked_out", labels) == 1
+            with pytest.raises(sa_exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        assert REGISTRY.get_sample_value("db_pool_checked_out", labels) == 0
+        assert REGISTRY.get_sample_value("db_pool_timeouts_total", labels) == 1
+        assert REGISTRY.get_sample_value("db_pool_checkout_seconds_count", labels) == 2
+    finally:
+        await engine.dispose()
+
+
+async def test_engine_options_skip_pool_settings_for_in_memory_sqlite() -> None:
+    settings = Settings(DB_POOL_SIZE=3)
+
+    assert engine_options("sqlite+aiosqlite:///:memory:", settings) == {}
+    options = engine_options("postgresql+asyncpg://user:pass@db/app", settings)
+    assert options["pool_size"] == 3
+    assert options["pool_pre_ping"] is True
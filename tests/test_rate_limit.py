@@ -0,0 +1,59 @@
+import pytest
+
+from app.core.rate_limit import RateLimited, TokenBucketLimiter, TrustedProxies
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_refills() -> None:
+    clock = FakeClock()
+    limiter = TokenBucketLimiter("test", capacity=2, refill_per_second=0.5, max_keys=10, clock=clock)
+
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(2.0)
+    # Other keys have their own bucket.
+    assert limiter.acquire("b") == 0
+
+    clock.now = 2
+    assert limiter.acquire("a") == 0
+    with pytest.raises(RateLimited) as exc_info:
+        limiter.check("a")
+    assert exc_info.value.retry_after == pytest.approx(2.0)
+
+
+def test_token_bucket_evicts_least_recently_used_keys() -> None:
+    limiter = TokenBucketLimiter("test", capacity=1, refill_per_second=0.01, max_keys=2, shards=1)
+
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("a")
+    limiter.acquire("c")
+
+    assert len(limiter) == 2
+    # "b" was evicted, so it starts again from a full bucket.
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("c") > 0
+
+
+def test_trusted_proxies_pick_the_nearest_untrusted_forwarded_hop() -> None:
+    proxies = TrustedProxies("10.0.0.0/8, 127.0.0.1")
+
+    assert proxies.client_ip("10.1.2.3", "198.51.100.7, 203.0.113.5, 10.0.0.9") == "203.0.113.5"
+    assert proxies.client_ip("10.1.2.3", None) == "10.1.2.3"
+    # Untrusted peers cannot pick their own bucket with a forged header.
+    assert proxies.client_ip("203.0.113.5", "198.51.100.7") == "203.0.113.5"
+    # With every hop trusted, the forged leftmost entry is ignored.
+    assert proxies.client_ip("10.1.2.3", "10.9.9.9, 10.0.0.9, 127.0.0.1") == "127.0.0.1"
+    # "*" trusts only the direct peer: its appended entry wins over anything the client sent.
+    trust_peer = TrustedProxies("*")
+    assert trust_peer.client_ip("203.0.113.5", "198.51.100.7") == "198.51.100.7"
+    assert trust_peer.client_ip("203.0.113.5", "1.2.3.4, 198.51.100.7") == "198.51.100.7"
+    assert trust_peer.client_ip("203.0.113.5", "5.6.7.8, 198.51.100.7") == "198.51.100.7"
+    assert TrustedProxies().client_ip("10.1.2.3", "198.51.100.7") == "10.1.2.3"
@@ -0,0 +1,135 @@
+"""Read/write split: GET routes read from a replica, except when the caller needs its own writes.
+
+The replica is a second SQLite file that only catches up when ``sync_replica`` copies
+the primary into it, which makes replication lag explicit and deterministic.
+"""
+
+import os
+from collections.abc import AsyncGenerator, Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.api.deps import READ_CONSISTENCY_HEADER, get_replica_db
+from app.core.config import get_api_prefix
+from app.db.base import Base
+from app.domain import models
+from app.main import app
+
+pytestmark = pytest.mark.asyncio
+
+API_PREFIX = get_api_prefix()
+REPLICA_DATABASE_URL = "sqlite+aiosqlite:///./test_replica.db"
+
+
+@pytest_asyncio.fixture()
+async def sync_replica(db_session: AsyncSession) -> AsyncGenerator[Callable[[], Awaitable[None]], None]:
+    primary_path = db_session.bind.url.database
+    engine = create_async_engine(REPLICA_DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    replica_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def _get_replica_session() -> AsyncGenerator[AsyncSession, None]:
+        async with replica_session() as session:
+            yield session
+
+    async def sync() -> None:
+        async with engine.begin() as conn:
+            await conn.execute(text("ATTACH DATABASE :path AS src"), {"path": primary_path})
+            for table in reversed(Base.metadata.sorted_tables):
+                await conn.execute(text(f"DELETE FROM main.{table.name}"))
+            for table in Base.metadata.sorted_tables:
+                await conn.execute(text(f"INSERT INTO main.{table.name} SELECT * FROM src.{table.name}"))
+        async with engine.begin() as conn:
+            await conn.execute(text("DETACH DATABASE src"))
+
+    previous_override = app.dependency_overrides[get_replica_db]
+    app.dependency_overrides[get_replica_db] = _get_replica_session
+    yield sync
+    app.dependency_overrides[get_replica_db] = previous_override
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    replica_path = REPLICA_DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+    if os.path.exists(replica_path):
+        os.remove(replica_path)
+
+
+async def login(client: AsyncClient, gym: models.Gym) -> dict[str, str]:
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": gym.email, "password": "password123"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def list_emails(client: AsyncClient, headers: dict[str, str]) -> list[str]:
+    response = await client.get(f"{API_PREFIX}/customers", headers=headers)
+    assert response.status_code == 200
+    return [customer["email"] for customer in response.json()]
+
+
+async def test_reads_are_served_by_the_replica(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession, sync_replica
+) -> None:
+    await sync_replica()
+    headers = await login(client, create_gym)
+    db_session.add(models.Customer(gym_id=create_gym.id, first_name="Rae", last_name="Lag", email="rae@example.com"))
+    await db_session.commit()
+
+    # The replica has not caught up yet.
+    assert await list_emails(client, headers) == []
+    assert await list_emails(client, {**headers, READ_CONSISTENCY_HEADER: "strong"}) == ["rae@example.com"]
+
+    await sync_replica()
+    assert await list_emails(client, headers) == ["rae@example.com"]
+
+
+async def test_new_gym_is_found_before_the_replica_catches_up(client: AsyncClient, sync_replica) -> None:
+    await sync_replica()
+    signup = await client.post(
+        f"{API_PREFIX}/auth/signup",
+        json={
+            "name": "Fresh Gym",
+            "email": "fresh@example.com",
+            "password": "Password123",
+            "monthly_fee_cents": 5000,
+            "currency": "USD",
+        },
+    )
+    assert signup.status_code == 201
+    login_response = await client.post(
+        f"{API_PREFIX}/auth/login", data={"username": "fresh@example.com", "password": "Password123"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert me.status_code == 200
+    assert me.json()["id"] == signup.json()["id"]
+    assert await list_emails(client, headers) == []
+
+
+async def test_mutations_read_their_own_writes(client: AsyncClient, create_gym: models.Gym, sync_replica) -> None:
+    await sync_replica()
+    headers = await login(client, create_gym)
+
+    created = await client.post(
+        f"{API_PREFIX}/customers",
+        json={"first_name": "Kai", "last_name": "Fresh", "email": "kai@example.com"},
+        headers=headers,
+    )
+    assert created.status_code == 201
+
+    assert await list_emails(client, headers) == ["kai@example.com"]
+    response = await client.get(f"{API_PREFIX}/customers/{created.json()['id']}", headers=headers)
+    assert response.status_code == 200
+
+    # Once the read-your-writes window has passed, reads go back to the (still stale) replica.
+    deps.recent_writers.clear()
+    assert await list_emails(client, headers) == []
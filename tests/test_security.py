@@ -1,10 +1,84 @@
-﻿import pytest
+﻿import asyncio
+import hashlib
+
+import pytest
 from datetime import timedelta
 
-from app.core.security import AuthError, create_access_token, decode_access_token
+from app.core.security import (
+    AuthError,
+    PasswordHasher,
+    PasswordHashingUnavailable,
+    create_access_token,
+    decode_access_token,
+    token_cache,
+    verify_access_token,
+    verify_password,
+)
+from app.core import security
+from app.core.cache import TTLCache
 
 
 def test_expired_token_rejected() -> None:
     token = create_access_token(subject="1", expires_delta=timedelta(seconds=-1))
     with pytest.raises(AuthError):
         decode_access_token(token)
+
+
+def test_verified_token_cache_skips_repeat_decoding(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = create_access_token(subject="7")
+    calls = []
+    original_decode = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return original_decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+
+    first = verify_access_token(token)
+    first["sub"] = "tampered"
+    second = verify_access_token(token)
+
+    assert second["sub"] == "7"
+    assert len(calls) == 1
+    assert token_cache.get(hashlib.sha256(token.encode()).digest()) is not None
+    with pytest.raises(AuthError):
+        verify_access_token(token + "x")
+
+
+def test_verified_token_cache_expires_at_token_exp(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    cache = TTLCache("test_token", max_entries=10, ttl_seconds=3600, clock=lambda: now[0])
+    monkeypatch.setattr(security, "token_cache", cache)
+    token = create_access_token(subject="7", expires_delta=timedelta(seconds=60))
+
+    key = hashlib.sha256(token.encode()).digest()
+
+    verify_access_token(token)
+    now[0] = 50
+    assert cache.get(key)["sub"] == "7"
+    now[0] = 61
+    assert cache.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_round_trip() -> None:
+    hasher = PasswordHasher(workers=2, max_queue=0)
+
+    hashed = await hasher.hash("password123")
+
+    assert verify_password("password123", hashed)
+    assert await hasher.verify("password123", hashed)
+    assert not await hasher.verify("wrong", hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated() -> None:
+    hasher = PasswordHasher(workers=1, max_queue=0)
+
+    results = await asyncio.gather(hasher.hash("first"), hasher.hash("second"), return_exceptions=True)
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], PasswordHashingUnavailable)
+    # Capacity is released once in-flight work finishes.
+    assert isinstance(await hasher.hash("third"), str)
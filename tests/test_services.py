@@ -1,16 +1,22 @@
-﻿import pytest
+﻿import json
+
+import pytest
 from datetime import date, timedelta
 
-from app.domain import schemas
+from app.db.sharding import DEFAULT_SHARD, ShardRouter
+from app.domain import models, schemas
 from app.services import auth as auth_service
+from app.services import customer_bulk
 from app.services import customers as customer_service
 from app.services import gyms as gym_service
+from app.services import token_revocation
+from app.workers import membership_sweeper
 
 
 pytestmark = pytest.mark.asyncio
 
 
-async def test_signup_gym_hashes_password_and_sends_mail(db_session, mailer_stub) -> None:
+async def test_signup_gym_hashes_password_and_queues_mail(db_session, mailer_stub, drain_outbox) -> None:
     gym_in = schemas.GymCreate(
         name="Service Gym",
         email="nikolozkipiani@icloud.com",
@@ -19,11 +25,11 @@ async def test_signup_gym_hashes_password_and_sends_mail(db_session, mailer_stub
         currency="USD",
     )
 
-    gym = await auth_service.signup_gym(db_session, gym_in, schedule_mail=mailer_stub.add_task)
+    gym = await auth_service.signup_gym(db_session, gym_in)
 
     assert gym.id is not None
     assert gym.hashed_password != gym_in.password
-    assert len(mailer_stub.sent) == 1
+    assert (await drain_outbox()).sent == 1
     sent_to, subject, body = mailer_stub.sent[0]
     assert sent_to == gym_in.email
     assert "Welcome" in subject
@@ -44,6 +50,24 @@ async def test_signup_gym_rejects_duplicate_email(db_session) -> None:
         await auth_service.signup_gym(db_session, gym_in)
 
 
+async def test_signup_gym_rejects_duplicate_email_before_hashing(db_session, monkeypatch) -> None:
+    gym_in = schemas.GymCreate(
+        name="Dup Gym",
+        email="dup-hash@example.com",
+        password="Password123",
+        monthly_fee_cents=4000,
+        currency="USD",
+    )
+    await auth_service.signup_gym(db_session, gym_in)
+
+    async def fail_hash(password: str) -> str:
+        raise AssertionError("duplicate signup must not hash the password")
+
+    monkeypatch.setattr(auth_service.password_hasher, "hash", fail_hash)
+    with pytest.raises(ValueError, match="Email already registered"):
+        await auth_service.signup_gym(db_session, gym_in)
+
+
 async def test_authenticate_gym_success_and_failure(db_session) -> None:
     gym_in = schemas.GymCreate(
         name="Auth Gym",
@@ -154,3 +178,249 @@ async def test_delete_gym_cascades_customers(db_session, create_gym) -> None:
     # Customers are deleted via cascade; fetching list should be empty.
     remaining = await customer_service.list_customers(db_session, gym.id)
     assert remaining == []
+
+
+async def test_list_customers_supports_keyset_cursor(db_session, create_gym) -> None:
+    gym = create_gym
+    for index in range(3):
+        await customer_service.create_customer(
+            db_session,
+            gym,
+            schemas.CustomerCreate(
+                first_name=f"Member{index}",
+                last_name="User",
+                email=f"member{index}@example.com",
+            ),
+        )
+
+    page_one = await customer_service.list_customers(db_session, gym.id, limit=2)
+    cursor = customer_service.encode_cursor(page_one[-1])
+    page_two = await customer_service.list_customers(db_session, gym.id, limit=2, cursor=cursor)
+
+    assert [c.email for c in page_one] == ["member2@example.com", "member1@example.com"]
+    assert [c.email for c in page_two] == ["member0@example.com"]
+
+
+async def test_list_customers_rejects_invalid_cursor(db_session, create_gym) -> None:
+    with pytest.raises(ValueError):
+        await customer_service.list_customers(db_session, create_gym.id, cursor="not-a-cursor")
+
+    with pytest.raises(ValueError):
+        await customer_service.list_customers(
+            db_session,
+            create_gym.id,
+            offset=1,
+            cursor=customer_service.encode_cursor(create_gym),
+        )
+
+
+async def test_deactivate_expired_memberships_updates_only_lapsed_rows(db_session, create_gym, monkeypatch) -> None:
+    gym = create_gym
+    # Rows inserted directly simulate memberships that lapsed after they were last written.
+    lapsed = models.Customer(
+        gym_id=gym.id,
+        first_name="Lapsed",
+        last_name="Member",
+        email="lapsed@example.com",
+        active=True,
+        membership_end=date.today() - timedelta(days=1),
+    )
+    current = models.Customer(
+        gym_id=gym.id,
+        first_name="Current",
+        last_name="Member",
+        email="current@example.com",
+        active=True,
+        membership_end=date.today(),
+    )
+    db_session.add_all([lapsed, current])
+    await db_session.commit()
+
+    monkeypatch.setattr(membership_sweeper, "shard_router", ShardRouter({DEFAULT_SHARD: db_session.bind}))
+    deactivated = await membership_sweeper.sweep_once()
+    assert deactivated == 1
+
+    await db_session.refresh(lapsed)
+    await db_session.refresh(current)
+    assert lapsed.active is False
+    assert current.active is True
+
+
+async def test_list_customers_active_filter_accounts_for_expiry(db_session, create_gym) -> None:
+    gym = create_gym
+    db_session.add_all(
+        [
+            models.Customer(
+                gym_id=gym.id,
+                first_name="Lapsed",
+                last_name="Member",
+                email="lapsed@example.com",
+                active=True,
+                membership_end=date.today() - timedelta(days=1),
+            ),
+            models.Customer(
+                gym_id=gym.id,
+                first_name="Open",
+                last_name="Ended",
+                email="open@example.com",
+                active=True,
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    active = await customer_service.list_customers(db_session, gym.id, active=True)
+    inactive = await customer_service.list_customers(db_session, gym.id, active=False)
+
+    assert [c.email for c in active] == ["open@example.com"]
+    assert [c.email for c in inactive] == ["lapsed@example.com"]
+    assert inactive[0].active is False
+    # The effective status is presented without a pending write.
+    assert not db_session.dirty
+
+
+async def test_search_index_tracks_updates_and_deletes(db_session, create_gym) -> None:
+    gym = create_gym
+    customer = await customer_service.create_customer(
+        db_session,
+        gym,
+        schemas.CustomerCreate(first_name="Morgan", last_name="Reyes", email="morgan@example.com"),
+    )
+
+    assert [c.id for c in await customer_service.list_customers(db_session, gym.id, search="organ")] == [customer.id]
+
+    await customer_service.update_customer(
+        db_session, gym.id, customer.id, schemas.CustomerUpdate(first_name="Jordan")
+    )
+    assert await customer_service.list_customers(db_session, gym.id, first_name="Morgan") == []
+    assert len(await customer_service.list_customers(db_session, gym.id, first_name="jord")) == 1
+    # Terms shorter than a trigram fall back to a LIKE scan.
+    assert len(await customer_service.list_customers(db_session, gym.id, last_name="Re")) == 1
+
+    await customer_service.delete_customer(db_session, gym.id, customer.id)
+    assert await customer_service.list_customers(db_session, gym.id, search="Jordan") == []
+
+
+async def test_search_ranks_by_relevance(db_session, create_gym) -> None:
+    gym = create_gym
+    for first_name, email in (("Sam", "sam.taylor@example.com"), ("Taylor", "taylor@example.com")):
+        await customer_service.create_customer(
+            db_session,
+            gym,
+            schemas.CustomerCreate(first_name=first_name, last_name="Taylor", email=email),
+        )
+
+    ranked = await customer_service.list_customers(db_session, gym.id, search="taylor", sort="relevance")
+    assert [c.email for c in ranked] == ["taylor@example.com", "sam.taylor@example.com"]
+
+    with pytest.raises(ValueError):
+        await customer_service.list_customers(db_session, gym.id, sort="relevance")
+
+
+async def test_bulk_update_processes_every_chunk(db_session, create_gym, monkeypatch) -> None:
+    gym = create_gym
+    db_session.add_all(
+        [
+            models.Customer(gym_id=gym.id, first_name="Bulk", last_name=str(index), email=f"b{index}@example.com")
+            for index in range(5)
+        ]
+    )
+    await db_session.commit()
+    monkeypatch.setattr(customer_bulk, "BULK_CHUNK_SIZE", 2)
+
+    affected = await customer_bulk.bulk_update_customers(
+        db_session, gym.id, schemas.CustomerUpdate(active=False), active=True
+    )
+
+    assert affected == 5
+    assert await customer_service.list_customers(db_session, gym.id, active=True) == []
+    assert await customer_bulk.bulk_delete_customers(db_session, gym.id, active=False) == 5
+
+
+async def test_list_customer_rows_matches_customer_out_serialization(db_session, create_gym) -> None:
+    gym = create_gym
+    await customer_service.create_customer(
+        db_session,
+        gym,
+        schemas.CustomerCreate(
+            first_name="Fast",
+            last_name="Path",
+            email="fast@example.com",
+            date_of_birth=date(1991, 2, 3),
+            membership_end=date.today() + timedelta(days=10),
+            notes="Long notes",
+        ),
+    )
+
+    entities = await customer_service.list_customers(db_session, gym.id)
+    rows = await customer_service.list_customer_rows(db_session, gym.id)
+
+    expected = [schemas.CustomerOut.model_validate(c).model_dump(mode="json") for c in entities]
+    assert json.loads(customer_service.rows_to_json(rows)) == expected
+
+
+async def test_list_customer_rows_sparse_fieldset(db_session, create_gym) -> None:
+    gym = create_gym
+    await customer_service.create_customer(
+        db_session,
+        gym,
+        schemas.CustomerCreate(first_name="Sparse", last_name="Fields", email="sparse@example.com"),
+    )
+
+    fields = customer_service.parse_fields("email, first_name")
+    rows = await customer_service.list_customer_rows(db_session, gym.id, fields=fields)
+
+    assert json.loads(customer_service.rows_to_json(rows, fields)) == [
+        {"email": "sparse@example.com", "first_name": "Sparse"}
+    ]
+    with pytest.raises(ValueError):
+        customer_service.parse_fields("email,hashed_password")
+
+
+async def test_sync_revocations_loads_live_entries_and_purges_expired(db_session) -> None:
+    now = models.utcnow()
+    db_session.add_all(
+        [
+            models.RevokedToken(jti="live", expires_at=now + timedelta(minutes=5)),
+            models.RevokedToken(jti="expired", expires_at=now - timedelta(minutes=5)),
+        ]
+    )
+    await db_session.commit()
+
+    loaded = await token_revocation.sync_revocations(db_session)
+
+    assert loaded == 1
+    assert "live" in token_revocation.revoked_tokens
+    assert "expired" not in token_revocation.revoked_tokens
+    assert await db_session.get(models.RevokedToken, "expired") is None
+
+
+async def test_update_customer_persists_expiry_in_the_same_statement(db_session, create_gym) -> None:
+    gym = create_gym
+    lapsed = models.Customer(
+        gym_id=gym.id,
+        first_name="Lee",
+        last_name="Park",
+        email="lee@example.com",
+        active=True,
+        membership_end=date.today() - timedelta(days=1),
+    )
+    db_session.add(lapsed)
+    await db_session.commit()
+
+    updated = await customer_service.update_customer(
+        db_session, gym.id, lapsed.id, schemas.CustomerUpdate(notes="Called")
+    )
+    assert updated.notes == "Called"
+    assert updated.active is False
+
+    renewed = await customer_service.update_customer(
+        db_session,
+        gym.id,
+        lapsed.id,
+        schemas.CustomerUpdate(active=True, membership_end=date.today() + timedelta(days=30)),
+    )
+    assert renewed.active is True
+    assert await customer_service.update_customer(
+        db_session, gym.id + 1, lapsed.id, schemas.CustomerUpdate(notes="Other gym")
+    ) is None
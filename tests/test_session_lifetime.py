@@ -0,0 +1,41 @@
+"""Sessions hold a pool connection only while the service call runs.
+
+Route sessions are function-scoped dependencies, so they are closed before the
+response is serialized and before any background task runs.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core.config import get_api_prefix
+from app.domain import models
+
+pytestmark = pytest.mark.asyncio
+
+API_PREFIX = get_api_prefix()
+
+
+async def test_login_releases_connection_before_password_check(
+    client: AsyncClient, create_gym: models.Gym, db_session: AsyncSession, monkeypatch
+) -> None:
+    pool = db_session.bind.pool
+    baseline = pool.checkedout()
+    checked_out = []
+    original_verify = security.password_hasher.verify
+
+    async def recording_verify(*args):
+        checked_out.append(pool.checkedout() - baseline)
+        return await original_verify(*args)
+
+    monkeypatch.setattr(security.password_hasher, "verify", recording_verify)
+
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": create_gym.email, "password": "password123"},
+    )
+
+    assert response.status_code == 200
+    assert checked_out == [0]
+
@@ -0,0 +1,195 @@
+"""Per-gym shard routing, with the default shard and one extra shard as separate SQLite files."""
+
+import os
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.deps import get_db, get_replica_db, get_shard_router
+from app.core.config import get_api_prefix
+from app.db.base import Base
+from app.db.sharding import DEFAULT_SHARD, ShardRouter
+from app.domain import models
+from app.main import app
+from app.services import gym_moves
+
+pytestmark = pytest.mark.asyncio
+
+API_PREFIX = get_api_prefix()
+SHARD_URLS = {
+    DEFAULT_SHARD: "sqlite+aiosqlite:///./test_shard_default.db",
+    "east": "sqlite+aiosqlite:///./test_shard_east.db",
+}
+
+
+@pytest_asyncio.fixture()
+async def shard_engines() -> AsyncGenerator[dict, None]:
+    engines = {name: create_async_engine(url) for name, url in SHARD_URLS.items()}
+    for engine in engines.values():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield engines
+    for engine in engines.values():
+        await engine.dispose()
+    for url in SHARD_URLS.values():
+        path = url.replace("sqlite+aiosqlite:///", "")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest_asyncio.fixture()
+async def shards(shard_engines: dict) -> AsyncGenerator[ShardRouter, None]:
+    """Serve the app from the shard files; new gyms are placed on ``east``."""
+    router = ShardRouter(shard_engines, placement_targets=["east"])
+
+    async def _get_default_session() -> AsyncGenerator[AsyncSession, None]:
+        async with router.session() as session:
+            yield session
+
+    previous = {dependency: app.dependency_overrides.get(dependency) for dependency in (get_db, get_replica_db)}
+    app.dependency_overrides[get_db] = _get_default_session
+    app.dependency_overrides[get_replica_db] = _get_default_session
+    app.dependency_overrides[get_shard_router] = lambda: router
+    yield router
+    app.dependency_overrides.update(previous)
+    app.dependency_overrides.pop(get_shard_router, None)
+
+
+async def count(router: ShardRouter, shard: str, model) -> int:
+    async with router.session(shard) as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+async def signup_and_login(client: AsyncClient, email: str) -> tuple[int, dict[str, str]]:
+    signup = await client.post(
+        f"{API_PREFIX}/auth/signup",
+        json={
+            "name": "Sharded Gym",
+            "email": email,
+            "password": "Password123",
+            "monthly_fee_cents": 5000,
+            "currency": "USD",
+        },
+    )
+    assert signup.status_code == 201
+    login = await client.post(f"{API_PREFIX}/auth/login", data={"username": email, "password": "Password123"})
+    assert login.status_code == 200
+    return signup.json()["id"], {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+async def test_requests_are_routed_to_the_gyms_shard(client: AsyncClient, shards: ShardRouter) -> None:
+    gym_id, headers = await signup_and_login(client, "east@example.com")
+
+    created = await client.post(
+        f"{API_PREFIX}/customers",
+        json={"first_name": "Eve", "last_name": "East", "email": "eve@example.com"},
+        headers=headers,
+    )
+    assert created.status_code == 201
+
+    listed = await client.get(f"{API_PREFIX}/customers", headers=headers)
+    assert [customer["email"] for customer in listed.json()] == ["eve@example.com"]
+    me = await client.get(f"{API_PREFIX}/gyms/me", headers=headers)
+    assert me.json()["id"] == gym_id
+
+    assert await shards.shard_for_gym(gym_id) == "east"
+    assert await count(shards, "east", models.Gym) == 1
+    assert await count(shards, "east", models.Customer) == 1
+    assert await count(shards, DEFAULT_SHARD, models.Gym) == 0
+    assert await count(shards, DEFAULT_SHARD, models.Customer) == 0
+
+
+async def test_email_is_unique_across_shards(client: AsyncClient, shards: ShardRouter) -> None:
+    await signup_and_login(client, "twice@example.com")
+    shards.placement_targets = [DEFAULT_SHARD]
+
+    response = await client.post(
+        f"{API_PREFIX}/auth/signup",
+        json={
+            "name": "Again",
+            "email": "twice@example.com",
+            "password": "Password123",
+            "monthly_fee_cents": 5000,
+            "currency": "USD",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert await count(shards, DEFAULT_SHARD, models.Gym) == 0
+
+
+async def test_gym_delete_commits_before_the_directory_entry_is_dropped(
+    client: AsyncClient, shards: ShardRouter, monkeypatch
+) -> None:
+    gym_id, headers = await signup_and_login(client, "leaving@example.com")
+
+    async def directory_down(*args) -> None:
+        raise RuntimeError("directory unavailable")
+
+    monkeypatch.setattr(shards, "unregister_gym", directory_down)
+    with pytest.raises(RuntimeError):
+        await client.delete(f"{API_PREFIX}/gyms/me", headers=headers)
+
+    assert await count(shards, "east", models.Gym) == 0
+    assert await shards.shard_for_gym(gym_id) == "east"
+
+
+async def test_least_gyms_placement_balances_new_gyms(shard_engines: dict) -> None:
+    router = ShardRouter(shard_engines)
+    placed = []
+    for index in range(4):
+        async with router.session() as session:
+            _, shard = await router.register_gym(session, f"gym{index}@example.com")
+        placed.append(shard)
+
+    assert sorted(placed) == [DEFAULT_SHARD, DEFAULT_SHARD, "east", "east"]
+
+
+async def test_move_gym_copies_rows_and_switches_the_directory(client: AsyncClient, shards: ShardRouter) -> None:
+    gym_id, headers = await signup_and_login(client, "mover@example.com")
+    for index in range(3):
+        await client.post(
+            f"{API_PREFIX}/customers",
+            json={"first_name": "Member", "last_name": str(index), "email": f"member{index}@example.com"},
+            headers=headers,
+        )
+
+    moved = await gym_moves.move_gym(shards, gym_id, DEFAULT_SHARD, batch_size=2)
+
+    assert moved == 3
+    assert await shards.shard_for_gym(gym_id) == DEFAULT_SHARD
+    assert await count(shards, DEFAULT_SHARD, models.Customer) == 3
+    assert await count(shards, "east", models.Gym) == 0
+    assert await count(shards, "east", models.Customer) == 0
+    listed = await client.get(f"{API_PREFIX}/customers", headers=headers)
+    assert len(listed.json()) == 3
+
+    with pytest.raises(ValueError):
+        await gym_moves.move_gym(shards, gym_id, DEFAULT_SHARD)
+
+
+async def test_move_gym_into_a_shard_that_already_has_customers(client: AsyncClient, shards: ShardRouter) -> None:
+    shards.placement_targets = [DEFAULT_SHARD]
+    _, resident_headers = await signup_and_login(client, "resident@example.com")
+    shards.placement_targets = ["east"]
+    mover_id, mover_headers = await signup_and_login(client, "mover@example.com")
+    for headers, prefix in ((resident_headers, "resident"), (mover_headers, "mover")):
+        for index in range(3):
+            created = await client.post(
+                f"{API_PREFIX}/customers",
+                json={"first_name": prefix, "last_name": str(index), "email": f"{prefix}{index}@example.com"},
+                headers=headers,
+            )
+            assert created.status_code == 201
+
+    # Customer ids come from the shard directory, so the two shards never hand out the same one.
+    assert await gym_moves.move_gym(shards, mover_id, DEFAULT_SHARD) == 3
+
+    assert await count(shards, DEFAULT_SHARD, models.Customer) == 6
+    listed = await client.get(f"{API_PREFIX}/customers", headers=mover_headers)
+    assert sorted(customer["email"] for customer in listed.json()) == [f"mover{index}@example.com" for index in range(3)]
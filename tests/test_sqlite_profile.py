@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import text
+
+from app.core.config import Settings
+from app.db.session import create_engine
+
+pytestmark = pytest.mark.asyncio
+
+
+async def pragma(engine, name: str):
+    async with engine.connect() as conn:
+        return (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+async def test_sqlite_profile_applies_pragmas_to_new_connections(tmp_path) -> None:
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}", Settings(), name="sqlite_profile")
+    try:
+        assert await pragma(engine, "journal_mode") == "wal"
+        assert await pragma(engine, "synchronous") == 1  # NORMAL
+        assert await pragma(engine, "busy_timeout") == 5000
+        assert await pragma(engine, "temp_store") == 2  # MEMORY
+        assert await pragma(engine, "cache_size") == -65536
+    finally:
+        await engine.dispose()
+
+
+async def test_sqlite_profile_can_be_disabled(tmp_path) -> None:
+    settings = Settings(SQLITE_PROFILE_ENABLED=False)
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'plain.db'}", settings, name="sqlite_plain")
+    try:
+        assert await pragma(engine, "journal_mode") == "delete"
+    finally:
+        await engine.dispose()
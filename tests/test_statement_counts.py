@@ -0,0 +1,115 @@
+"""Round-trip regression tests for write endpoints.
+
+Each mutation must reach the database as a single ``INSERT``/``UPDATE ... RETURNING``
+statement, with no follow-up ``SELECT`` to refresh the written row; writes that
+send mail add one ``INSERT`` into the email outbox. Authentication
+is served from the token and principal caches, which are warmed first.
+"""
+
+from collections.abc import Iterator
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_api_prefix
+from app.domain import models
+
+pytestmark = pytest.mark.asyncio
+
+API_PREFIX = get_api_prefix()
+
+
+@pytest.fixture()
+def statements(db_session: AsyncSession) -> Iterator[list[str]]:
+    captured: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        captured.append(" ".join(statement.split()))
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield captured
+    event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def login(client: AsyncClient, gym: models.Gym) -> dict[str, str]:
+    response = await client.post(
+        f"{API_PREFIX}/auth/login",
+        data={"username": gym.email, "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get(f"{API_PREFIX}/gyms/me", headers=headers)).status_code == 200
+    return headers
+
+
+def assert_single_returning(statements: list[str], verb: str) -> None:
+    assert len(statements) == 1, statements
+    assert statements[0].startswith(verb)
+    assert "RETURNING" in statements[0]
+
+
+async def test_signup_is_one_statement_between_directory_and_outbox(
+    client: AsyncClient, statements: list[str]
+) -> None:
+    response = await client.post(
+        f"{API_PREFIX}/auth/signup",
+        json={
+            "name": "Count Gym",
+            "email": "count@example.com",
+            "password": "password123",
+            "monthly_fee_cents": 5000,
+            "currency": "USD",
+        },
+    )
+
+    assert response.status_code == 201
+    # The directory email probe runs before hashing and the directory row allocates the gym id;
+    # the gym itself is still one INSERT ... RETURNING.
+    probe, directory, *gym_statements, outbox = statements
+    assert probe.startswith("SELECT gym_shards.gym_id")
+    assert directory.startswith("INSERT INTO gym_shards")
+    assert_single_returning(gym_statements, "INSERT INTO gyms")
+    assert outbox.startswith("INSERT INTO email_outbox")
+
+
+async def test_update_gym_is_one_statement(
+    client: AsyncClient, create_gym: models.Gym, statements: list[str]
+) -> None:
+    headers = await login(client, create_gym)
+    statements.clear()
+
+    response = await client.patch(f"{API_PREFIX}/gyms/me", json={"name": "Renamed"}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert_single_returning(statements, "UPDATE gyms")
+
+
+async def test_create_and_update_customer_are_one_statement_each(
+    client: AsyncClient, create_gym: models.Gym, statements: list[str]
+) -> None:
+    headers = await login(client, create_gym)
+    statements.clear()
+
+    created = await client.post(
+        f"{API_PREFIX}/customers",
+        json={"first_name": "Ana", "last_name": "Count", "email": "ana@example.com"},
+        headers=headers,
+    )
+    assert created.status_code == 201
+    # A customer id block is allocated once per CUSTOMER_ID_BLOCK_SIZE customers, not per request.
+    *customer_statements, outbox = [s for s in statements if not s.startswith("INSERT INTO customer_id_blocks")]
+    assert_single_returning(customer_statements, "INSERT INTO customers")
+    assert outbox.startswith("INSERT INTO email_outbox")
+
+    statements.clear()
+    updated = await client.patch(
+        f"{API_PREFIX}/customers/{created.json()['id']}",
+        json={"notes": "Updated"},
+        headers=headers,
+    )
+    assert updated.status_code == 200
+    assert updated.json()["notes"] == "Updated"
+    assert_single_returning(statements, "UPDATE customers")